@@ -0,0 +1,84 @@
+import argparse
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from constants import ADDRESS_REPLACEMENTS, BIRD_REPLACEMENTS, CLEAN_SHEET_COLS
+import ingest
+
+
+def write_sample_sheet(output_fi: str, num_rows: int, encoding: str) -> None:
+    """
+    Writes a synthetic raw data sheet built from the raw values in the rule tables
+    :param output_fi: File to write
+    :param num_rows: Number of rows to write
+    :param encoding: Encoding of the output file
+    :return: None
+    """
+    rand = random.Random(0)
+    with open(output_fi, mode="w", encoding=encoding, newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(CLEAN_SHEET_COLS)
+        for _ in range(num_rows):
+            row = [f"{rand.randint(1, 12)}/{rand.randint(1, 28)}/2019", rand.choice(BIRD_REPLACEMENTS)[0]]
+            row += ["" for _ in CLEAN_SHEET_COLS[2:]]
+            row[CLEAN_SHEET_COLS.index("Address where found")] = rand.choice(ADDRESS_REPLACEMENTS)[0]
+            writer.writerow(row)
+
+
+def read_dict_rows(input_fi: str) -> int:
+    """
+    Reads a sheet the way `get_cleaned_data` did before the ingestion layer was added
+    :param input_fi: File to read
+    :return: Number of rows read
+    """
+    with open(input_fi) as f:
+        return sum(1 for _ in csv.DictReader(f))
+
+
+def read_list_rows(input_fi: str) -> int:
+    """
+    Reads a sheet with `ingest.iter_rows`
+    :param input_fi: File to read
+    :return: Number of rows read, excluding the header
+    """
+    return sum(1 for _ in ingest.iter_rows(input_fi)) - 1
+
+
+def time_reader(reader, input_fi: str, repeats: int) -> float:
+    """
+    Times a reader, returning the best of several runs
+    :param reader: Function that reads `input_fi`
+    :param input_fi: File to read
+    :param repeats: Number of times to read the file
+    :return: Fastest time in seconds
+    """
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        reader(input_fi)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num_rows", type=int, default=200000)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for encoding in ["utf-8", "utf-8-sig"]:
+            sheet = os.path.join(tmp_dir, f"2019_{encoding}.csv")
+            write_sample_sheet(sheet, args.num_rows, encoding)
+            readers = [("csv.DictReader", read_dict_rows), ("ingest.iter_rows", read_list_rows)]
+            for name, reader in readers:
+                elapsed = time_reader(reader, sheet, args.repeats)
+                print(f"{encoding:10} {name:26} {args.num_rows / elapsed:12,.0f} rows/s")
@@ -1,16 +1,40 @@
 import argparse
-import csv
+import datetime
 import re
 
+import stats
+
 from collections import OrderedDict
+from functools import lru_cache
 from pathlib import Path
-
-from constants import ADDRESS_ENDINGS, ADDRESS_REPLACEMENTS, ALT_ADDR_COLS, ALT_BIRD_COLS, \
-    BIRD_REPLACEMENTS, BIRD_SUBSTRING_MAPPINGS, CLEAN_SHEET_COLS, DEFAULT_ADDR_COL, \
-    DEFAULT_BIRD_COL, DIRECTIONS, NEEDS_NW, PRE_CLEAN_ADDRESS_REPLACEMENTS, \
-    UNKNOWN_ADDRESS, UNKNOWN_BIRD, UNKNOWN_DATE, ALWAYS_SUBS
-
-
+from typing import Callable
+
+from constants import ALT_ADDR_COLS, ALT_BIRD_COLS, CLEAN_SHEET_COLS, DATE_COLS, DEFAULT_ADDR_COL, \
+    DEFAULT_BIRD_COL, MIGRATION_SEASONS, OTHER_SEASON, UNKNOWN_ADDRESS, UNKNOWN_BIRD, UNKNOWN_DATE
+from ingest import iter_rows
+from outputs import FLAT_LAYOUT, write_table
+from rules import load_rule_bundle
+
+# Rule tables from constants.py, precompiled into lookups and regexes
+RULES = load_rule_bundle()
+NOMA_PATTERN = re.compile(r"(?i)\s+noma(\b|$)")
+CONDOMINIUM_PATTERN = re.compile(r"Condominium(\b)")
+NW_SLASH_PATTERN = re.compile(r"NW\s*/.*")
+TO_THE_RIGHT_PATTERN = re.compile(r" to the right.*")
+DASHES_PATTERN = re.compile("-+")
+UNIT_NUMBER_PATTERN = re.compile(r" #.*")
+BETWEEN_PATTERN = re.compile(r" between.*")
+SP_SUFFIX_PATTERN = re.compile(r" Sp$")
+TRAILING_NUMBER_PATTERN = re.compile(r" \d+\s*$")
+# Maximum number of distinct raw values whose normalized versions are cached
+NORMALIZATION_CACHE_SIZE = 65536
+
+TOTAL_ROW_PATTERN = re.compile(r"(?i)Total:\s*\d+\s*birds")
+# Legend and summary lines at the end of some sheets, like "Gray shading:" or "Final:"
+LEGEND_ROW_PATTERN = re.compile(r"(?i)^(\w+ shading|note|final):")
+
+
+@lru_cache(maxsize=NORMALIZATION_CACHE_SIZE)
 def clean_address(addr: str) -> str:
     """
     Normalize address string
@@ -20,41 +44,37 @@ def clean_address(addr: str) -> str:
     if not addr:
         return UNKNOWN_ADDRESS
     clean = " ".join(addr.replace("\n", " ").replace("\r", " ").split())
-    for s_from, s_to in PRE_CLEAN_ADDRESS_REPLACEMENTS:
-        if clean == s_from:
-            clean = s_to
-    for s_search, s_to in ALWAYS_SUBS:
-        if re.search(s_search, clean):
+    clean = RULES["pre_clean_address_lookup"].get(clean, clean)
+    for s_search, s_to in RULES["always_subs"]:
+        if s_search.search(clean):
             clean = s_to
     # fix case of directions
     clean = clean.replace(".", "").split(";")[0].strip().replace("\n", " ")
     clean = clean.replace("&", "and").replace(" And ", " and ")
-    for direct in DIRECTIONS:
-        clean = re.sub(rf"(?i)(\b){direct}(\b)", rf"\1{direct}\2", clean)
-        clean = clean.replace(f", {direct}", f" {direct}")
-        clean = re.sub(rf"(?i)(\b){direct} and(\b)", rf"\1and\2", clean)
+    for direct, direct_pattern, comma_direct, direct_and_pattern in RULES["directions"]:
+        clean = direct_pattern.sub(direct, clean)
+        clean = clean.replace(comma_direct, f" {direct}")
+        clean = direct_and_pattern.sub("and", clean)
     for sep in [" - ", ",", "("]:
         clean = clean.split(sep)[0]
-    for s_from, s_to in ADDRESS_REPLACEMENTS:
-        if s_from.startswith("^") and clean == s_from.strip("^"):
+    for s_from, s_to, exact in RULES["address_replacements"]:
+        if exact is not None and clean == exact:
             clean = s_to
         else:
             clean = clean.replace(s_from, s_to)
-    clean = re.sub(r"(?i)\s+noma(\b|$)", "", clean)
-    clean = re.sub(r"Condominium(\b)", r"Condominiums\1", clean)
-    for needs_nw in NEEDS_NW:
-        clean = re.sub(rf"{needs_nw}\s*$", f"{needs_nw} NW", clean)
-    for needs_ne in ["1701 Rhode Island Ave"]:
-        clean = re.sub(rf"{needs_ne}\s*$", f"{needs_ne} NE", clean)
-    clean = re.sub(r"NW\s*/.*", "NW", clean)
+    clean = NOMA_PATTERN.sub("", clean)
+    clean = CONDOMINIUM_PATTERN.sub(r"Condominiums\1", clean)
+    for needs_quadrant, s_to in RULES["needs_quadrant"]:
+        clean = needs_quadrant.sub(s_to, clean)
+    clean = NW_SLASH_PATTERN.sub("NW", clean)
     clean = " ".join(clean.strip().split())
-    for ending in ADDRESS_ENDINGS:
-        clean = re.sub(rf"({ending}).*", r"\1", clean)
-    clean = re.sub(r" to the right.*", "", clean)
-    clean = re.sub("-+", "-", clean)
+    for ending in RULES["address_endings"]:
+        clean = ending.sub(r"\1", clean)
+    clean = TO_THE_RIGHT_PATTERN.sub("", clean)
+    clean = DASHES_PATTERN.sub("-", clean)
     clean = clean.replace("NW NW", "NW").replace("NE NE", "NE").replace("SW SW", "SW")
-    clean = re.sub(r" #.*", "", clean)
-    clean = re.sub(r" between.*", "", clean)
+    clean = UNIT_NUMBER_PATTERN.sub("", clean)
+    clean = BETWEEN_PATTERN.sub("", clean)
     return clean if clean else UNKNOWN_ADDRESS
 
 
@@ -70,6 +90,7 @@ def get_bird_gender(bird: str) -> str:
         return "female"
 
 
+@lru_cache(maxsize=NORMALIZATION_CACHE_SIZE)
 def clean_bird(bird: str) -> str:
     """
     Normalize name of bird
@@ -78,46 +99,68 @@ def clean_bird(bird: str) -> str:
     """
     bird = bird.split("(")[0].split(",")[0].title().replace("'S", "'s").strip()
     bird = " ".join(bird.split())
-    for from_s, to_s in BIRD_SUBSTRING_MAPPINGS:
+    for from_s, to_s in RULES["bird_substring_mappings"]:
         bird = bird.replace(from_s, to_s)
-    for from_s, to_s in BIRD_REPLACEMENTS:
-        if bird == from_s:
-            bird = to_s
+    bird = RULES["bird_lookup"].get(bird, bird)
     if ("Unidentified" in bird) or ("Unknown" in bird):
         bird = UNKNOWN_BIRD
-    bird = re.sub(r" Sp$", " Species", bird)
-    bird = re.sub(r" \d+\s*$", "", bird)
+    bird = SP_SUFFIX_PATTERN.sub(" Species", bird)
+    bird = TRAILING_NUMBER_PATTERN.sub("", bird)
     if " or " in bird.lower():
         return UNKNOWN_BIRD
     return bird.strip()
 
 
-def get_variably_named_val(column_alts: list, line: OrderedDict) -> str:
+def get_first_val(row: list, col_idxs: list) -> str:
     """
-    Return the value of the first address column alias that is not null
-    :param column_alts: Different names for the same column
-    :param line: OrderedDict representing the mapping from column names to values
-    :return: The first non-null value in line of one of the `column_alts`
+    Return the first non-null value of a row among the columns at `col_idxs`
+    :param row: List of values in a row
+    :param col_idxs: Positions of the different names for the same column, in order of preference
+    :return: The first non-null value
     """
-    for alt in column_alts:
-        if line.get(alt):
-            return line[alt]
+    for idx in col_idxs:
+        if row[idx]:
+            return row[idx]
 
 
-def clean_date(line: OrderedDict) -> str:
+def get_col_idxs(header: list, column_alts: list) -> list:
     """
-    Extract date from row and normalize to YYYY-MM-DD format
-    :param line: Row of data
+    Get the positions of the different names for the same column. A name that appears more than once, like the
+    two address columns of the 2016 sheet, keeps its rank, with its later columns used as fallbacks for the first
+    :param header: List of column names
+    :param column_alts: Different names for the same column, in order of preference
+    :return: Positions of the columns, in order of preference
+    """
+    return [idx for alt in column_alts for idx, col in enumerate(header) if col == alt]
+
+
+def get_row_date(row: list, header: list, date_idxs: list, clean_fn: Callable = None) -> str:
+    """
+    Extract the date from a row, using the last of its date columns that is not null, and normalize it
+    :param row: List of values in a row
+    :param header: List of column names, for the warning printed if the row has no date
+    :param date_idxs: Positions of the row's date columns, in the order of `DATE_COLS`
+    :param clean_fn: Function that normalizes the date value, `clean_date_value` by default
     :return: Normalized date
     """
     date = ""
-    for date_col in ["Date", "date", "Date Jotform (MMDDYYYY)"]:
-        if line.get(date_col):
-            date = line[date_col]
+    for idx in date_idxs:
+        if row[idx]:
+            date = row[idx]
     if not date:
-        print(f"No date column in {line}")
+        print(f"No date column in {dict(zip(header, row))}")
         return UNKNOWN_DATE
-    return clean_date_value(date)
+    return (clean_fn or clean_date_value)(date)
+
+
+def clean_date(line: OrderedDict) -> str:
+    """
+    Extract date from row and normalize to YYYY-MM-DD format
+    :param line: Row of data
+    :return: Normalized date
+    """
+    header = list(line.keys())
+    return get_row_date(list(line.values()), header, get_col_idxs(header, DATE_COLS))
 
 
 def clean_date_value(date: str) -> str:
@@ -140,121 +183,273 @@ def clean_date_value(date: str) -> str:
 
 
 
-def get_cleaned_data(input_fi: str, year: int) -> tuple:
+@stats.timed("get_cleaned_data")
+def get_cleaned_data(input_fi: str, year: int, count: bool = True) -> tuple:
     """
     Cleans data, returning a tuple of dicts:
       * Cleaned rows
       * Dict mapping addresses to years to bird counts
       * Dict mapping birds to years counts
+      * Dict mapping dates to addresses to bird counts
     :param input_fi: File containing raw data
     :param year: Year of data being cleaned
+    :param count: If false, only clean the rows, leaving the count dicts empty, e.g. when the rows will be
+        deduplicated and counted along with other files
     :return: Tuple of data dicts as specified above
     """
     address_to_bird = {}
     bird_counts = {year: {}}
+    date_counts = {}
     cleaned_rows = []
 
-    with open(input_fi) as f:
-        for line in csv.DictReader(f):
-            # clean up bird species
-            raw_bird = get_variably_named_val(ALT_BIRD_COLS, line)
-            if (not raw_bird) or (raw_bird == "Not used") or re.search(r"(?i)Total:\s*\d+\s*birds", str(line)):
-                continue
-            if not "Sex, if known" in line:
-                line["Sex, if known"] = get_bird_gender(raw_bird)
-            cleaned_bird = clean_bird(raw_bird)
-            if cleaned_bird.lower() == "deleted":
-                continue
-            line[DEFAULT_BIRD_COL] = raw_bird
-            line["Clean Bird Species"] = cleaned_bird
-
-            # clean up address
-            raw_addr = get_variably_named_val(ALT_ADDR_COLS, line)
-            if not raw_addr:
-                print(f"Warning, no address for line: {line}")
-            cleaned_addr = clean_address(raw_addr)
-            line["Clean Address"] = cleaned_addr
-            line[DEFAULT_ADDR_COL] = raw_addr
-            line["Date"] = clean_date(line)
-            cleaned_rows.append({k: v for k, v in line.items() if k in CLEAN_SHEET_COLS})
-            if cleaned_addr not in address_to_bird:
-                address_to_bird[cleaned_addr] = {year: {}}
-            address_to_bird[cleaned_addr][year][cleaned_bird] = address_to_bird[cleaned_addr][year].get(cleaned_bird, 0)+1
-            bird_counts[year][cleaned_bird] = bird_counts[year].get(cleaned_bird, 0)+1
-    return cleaned_rows, address_to_bird, bird_counts
-
-
-def write_clean_sheet(data: list, output_prefix: str) -> None:
+    # when stats are enabled, these record the time spent in each step; otherwise they're the plain functions
+    rows = stats.timed_iter("parse", iter_rows(input_fi))
+    clean_bird_fn = stats.timed_function("clean_bird", clean_bird)
+    clean_address_fn = stats.timed_function("clean_address", clean_address)
+    clean_date_fn = stats.timed_function("clean_date", clean_date_value)
+    header = next(rows, [])
+    # column positions are resolved once per file. Repeated address columns are all used, in order; other
+    # repeated column names resolve to the last one, as they would with csv.DictReader
+    col_to_idx = {col: idx for idx, col in enumerate(header)}
+    bird_idxs = [col_to_idx[col] for col in ALT_BIRD_COLS if col in col_to_idx]
+    addr_idxs = get_col_idxs(header, ALT_ADDR_COLS)
+    date_idxs = [col_to_idx[col] for col in DATE_COLS if col in col_to_idx]
+    kept_cols = [(col, idx) for col, idx in col_to_idx.items() if col in CLEAN_SHEET_COLS]
+    has_sex_col = "Sex, if known" in col_to_idx
+    for row in rows:
+        if not row:
+            continue
+        if len(row) < len(header):
+            row = [*row, *([None] * (len(header) - len(row)))]
+        if LEGEND_ROW_PATTERN.search(next((v for v in row if v), "")):
+            continue
+        # clean up bird species
+        raw_bird = get_first_val(row, bird_idxs)
+        if (not raw_bird) or (raw_bird == "Not used") or TOTAL_ROW_PATTERN.search("|".join(v for v in row if v)):
+            continue
+        line = {col: row[idx] for col, idx in kept_cols}
+        if not has_sex_col:
+            line["Sex, if known"] = get_bird_gender(raw_bird)
+        cleaned_bird = clean_bird_fn(raw_bird)
+        if cleaned_bird.lower() == "deleted":
+            continue
+        line[DEFAULT_BIRD_COL] = raw_bird
+        line["Clean Bird Species"] = cleaned_bird
+
+        # clean up address
+        raw_addr = get_first_val(row, addr_idxs)
+        if not raw_addr:
+            print(f"Warning, no address for line: {dict(zip(header, row))}")
+        cleaned_addr = clean_address_fn(raw_addr)
+        line["Clean Address"] = cleaned_addr
+        line[DEFAULT_ADDR_COL] = raw_addr
+        line["Date"] = get_row_date(row, header, date_idxs, clean_date_fn)
+        cleaned_rows.append(line)
+        if count:
+            count_row(line, year, address_to_bird, bird_counts, date_counts)
+    stats.count_rows("get_cleaned_data", len(cleaned_rows))
+    return cleaned_rows, address_to_bird, bird_counts, date_counts
+
+
+def count_row(row: dict, year: int, address_to_bird: dict, bird_counts: dict, date_counts: dict = None) -> None:
+    """
+    Add a cleaned row to the bird counts
+    :param row: Cleaned row
+    :param year: Year of the row's data
+    :param address_to_bird: Dict mapping addresses to years to bird counts, updated in place
+    :param bird_counts: Dict mapping years to bird counts, updated in place
+    :param date_counts: If specified, dict mapping dates to addresses to bird counts, updated in place
+    :return: None
+    """
+    cleaned_bird = row["Clean Bird Species"]
+    address_bird_counts = address_to_bird.setdefault(row["Clean Address"], {}).setdefault(year, {})
+    address_bird_counts[cleaned_bird] = address_bird_counts.get(cleaned_bird, 0)+1
+    year_bird_counts = bird_counts.setdefault(year, {})
+    year_bird_counts[cleaned_bird] = year_bird_counts.get(cleaned_bird, 0)+1
+    if date_counts is not None:
+        count_date(row, date_counts)
+
+
+def count_date(row: dict, date_counts: dict) -> None:
+    """
+    Add a cleaned row to the daily bird counts, if its date is known
+    :param row: Cleaned row
+    :param date_counts: Dict mapping dates to addresses to bird counts, updated in place
+    :return: None
+    """
+    try:
+        date = datetime.date.fromisoformat(row["Date"])
+    except ValueError:
+        return
+    cleaned_bird = row["Clean Bird Species"]
+    address_bird_counts = date_counts.setdefault(date, {}).setdefault(row["Clean Address"], {})
+    address_bird_counts[cleaned_bird] = address_bird_counts.get(cleaned_bird, 0)+1
+
+
+def get_season(date: datetime.date) -> str:
+    """
+    Get the migration season of a date
+    :param date: Date a bird was found
+    :return: Name of the season, as defined in MIGRATION_SEASONS
+    """
+    for season, first_month, last_month in MIGRATION_SEASONS:
+        if first_month <= date.month <= last_month:
+            return season
+    return OTHER_SEASON
+
+
+@stats.timed("write_clean_sheet")
+def write_clean_sheet(data: list, output_prefix: str, delta: bool = False,
+                      layout: str = FLAT_LAYOUT, compression: str = None, years: list = None) -> None:
     """
     Writes cleaned version of raw input data
     :param data: Cleaned data
     :param output_prefix: Prefix of output file
+    :param delta: If true, also write the rows added and removed since the last delta run
+    :param layout: "flat" to write each table to a single csv, or "partitioned" to write tables with a year column
+        as a directory of files per year
+    :param compression: Compression to apply to the output files, if any ("gzip" or "zstd")
+    :param years: Year of the sheet each row came from, which the rows are partitioned by, so that they land in the
+        same year as their counts
     :return: None
     """
-    with open(f"{output_prefix}_clean.csv", mode="w") as f:
-        writer = csv.DictWriter(f, fieldnames=CLEAN_SHEET_COLS)
-        writer.writeheader()
-        for row in data:
-            writer.writerow(row)
+    write_table(data, CLEAN_SHEET_COLS, f"{output_prefix}_clean.csv", delta=delta, layout=layout,
+                compression=compression, partition_values=years)
+    stats.count_rows("write_clean_sheet", len(data))
 
 
-def write_address_counts(data: dict, output_prefix: str) -> None:
+@stats.timed("write_address_counts")
+def write_address_counts(data: dict, output_prefix: str, delta: bool = False,
+                         layout: str = FLAT_LAYOUT, compression: str = None) -> None:
     """
     Writes csvs mapping addresses to years to bird counts and addresses to bird counts
     :param data: Dict mapping addresses to years to bird counts
     :param output_prefix: Prefix of output file
+    :param delta: If true, also write the rows added, removed, and changed since the last delta run
+    :param layout: "flat" to write each table to a single csv, or "partitioned" to write tables with a year column
+        as a directory of files per year
+    :param compression: Compression to apply to the output files, if any ("gzip" or "zstd")
     :return: None
     """
-    with open(f"{output_prefix}_bird_bldg_counts.csv", mode="w") as f:
-        writer = csv.DictWriter(f, fieldnames=["Building", "Bird", "Year", "Count"])
-        writer.writeheader()
-        for address in sorted(data.keys()):
-            for year in sorted(data[address].keys()):
-                for bird in data[address][year]:
-                    writer.writerow({
-                        "Building": address,
-                        "Bird": bird,
-                        "Count": data[address][year][bird],
-                        "Year": year
-                    })
-    with open(f"{output_prefix}_bldg_counts.csv", mode="w") as f:
-        writer = csv.DictWriter(f, fieldnames=["Building", "Year", "Count"])
-        writer.writeheader()
-        for address in sorted(data.keys()):
-            for year in sorted(data[address].keys()):
-                writer.writerow({
+    num_rows = 0
+    rows = []
+    for address in sorted(data.keys()):
+        for year in sorted(data[address].keys()):
+            for bird in data[address][year]:
+                rows.append({
                     "Building": address,
-                    "Count": sum([data[address][year][bird] for bird in data[address][year]]),
+                    "Bird": bird,
+                    "Count": data[address][year][bird],
                     "Year": year
                 })
-    with open(f"total_bldg_counts.csv", mode="w") as f:
-        writer = csv.DictWriter(f, fieldnames=["Building", "Count", "First Year"])
-        writer.writeheader()
-        for address in sorted(data.keys()):
-            writer.writerow({
+    write_table(rows, ["Building", "Bird", "Year", "Count"], f"{output_prefix}_bird_bldg_counts.csv",
+                key_cols=["Building", "Bird", "Year"], delta=delta, partition_col="Year", layout=layout,
+                compression=compression)
+    num_rows += len(rows)
+    rows = []
+    for address in sorted(data.keys()):
+        for year in sorted(data[address].keys()):
+            rows.append({
                 "Building": address,
-                "Count": sum([data[address][year][bird] for year in data[address] for bird in data[address][year]]),
-                "First Year": min(data[address].keys())
+                "Count": sum([data[address][year][bird] for bird in data[address][year]]),
+                "Year": year
             })
-
-
-def write_bird_counts(data: dict, output_prefix: str) -> None:
+    write_table(rows, ["Building", "Year", "Count"], f"{output_prefix}_bldg_counts.csv",
+                key_cols=["Building", "Year"], delta=delta, partition_col="Year", layout=layout,
+                compression=compression)
+    num_rows += len(rows)
+    rows = []
+    for address in sorted(data.keys()):
+        rows.append({
+            "Building": address,
+            "Count": sum([data[address][year][bird] for year in data[address] for bird in data[address][year]]),
+            "First Year": min(data[address].keys())
+        })
+    # totals span all years, so this table is never partitioned
+    write_table(rows, ["Building", "Count", "First Year"], Path(output_prefix).with_name("total_bldg_counts.csv"),
+                key_cols=["Building"], delta=delta, layout=layout, compression=compression)
+    stats.count_rows("write_address_counts", num_rows + len(rows))
+
+
+@stats.timed("write_bird_counts")
+def write_bird_counts(data: dict, output_prefix: str, delta: bool = False,
+                      layout: str = FLAT_LAYOUT, compression: str = None) -> None:
     """
     Writes csv mapping birds to years to bird counts
     :param data: Dict mapping birds to years to bird counts
     :param output_prefix: Prefix of output file
+    :param delta: If true, also write the rows added, removed, and changed since the last delta run
+    :param layout: "flat" to write each table to a single csv, or "partitioned" to write tables with a year column
+        as a directory of files per year
+    :param compression: Compression to apply to the output files, if any ("gzip" or "zstd")
     :return: None
     """
-    with open(f"{output_prefix}_bird_counts.csv", mode="w") as f:
-        writer = csv.DictWriter(f, fieldnames=["Bird", "Year", "Count"])
-        writer.writeheader()
-        for year in sorted(data.keys()):
-            for bird in data[year]:
-                writer.writerow({
+    rows = []
+    for year in sorted(data.keys()):
+        for bird in data[year]:
+            rows.append({
+                "Bird": bird,
+                "Count": data[year][bird],
+                "Year": year
+            })
+    write_table(rows, ["Bird", "Year", "Count"], f"{output_prefix}_bird_counts.csv", key_cols=["Bird", "Year"],
+                delta=delta, partition_col="Year", layout=layout, compression=compression)
+    stats.count_rows("write_bird_counts", len(rows))
+
+
+@stats.timed("write_date_counts")
+def write_date_counts(data: dict, output_prefix: str, delta: bool = False,
+                      layout: str = FLAT_LAYOUT, compression: str = None) -> None:
+    """
+    Writes csvs of bird counts per building for each day, ISO week, and migration season. The weekly and seasonal
+    counts are rolled up from the daily counts
+    :param data: Dict mapping dates to addresses to bird counts
+    :param output_prefix: Prefix of output file
+    :param delta: If true, also write the rows added, removed, and changed since the last delta run
+    :param layout: "flat" to write each table to a single csv, or "partitioned" to write tables with a year column
+        as a directory of files per year
+    :param compression: Compression to apply to the output files, if any ("gzip" or "zstd")
+    :return: None
+    """
+    daily_rows, week_counts, season_counts = [], {}, {}
+    for date in sorted(data.keys()):
+        week = date.isocalendar()[:2]
+        season = (date.year, get_season(date))
+        for address in sorted(data[date].keys()):
+            for bird in sorted(data[date][address].keys()):
+                count = data[date][address][bird]
+                daily_rows.append({
+                    "Date": date.isoformat(),
+                    "Building": address,
                     "Bird": bird,
-                    "Count": data[year][bird],
-                    "Year": year
+                    "Count": count
                 })
+                week_counts[(week, address, bird)] = week_counts.get((week, address, bird), 0)+count
+                season_counts[(season, address, bird)] = season_counts.get((season, address, bird), 0)+count
+    write_table(daily_rows, ["Date", "Building", "Bird", "Count"], f"{output_prefix}_daily_counts.csv",
+                key_cols=["Date", "Building", "Bird"], delta=delta, partition_col="Date", layout=layout,
+                compression=compression)
+    weekly_rows = [{
+        "ISO Year": iso_year,
+        "ISO Week": iso_week,
+        "Building": address,
+        "Bird": bird,
+        "Count": count
+    } for ((iso_year, iso_week), address, bird), count in sorted(week_counts.items())]
+    write_table(weekly_rows, ["ISO Year", "ISO Week", "Building", "Bird", "Count"],
+                f"{output_prefix}_weekly_counts.csv", key_cols=["ISO Year", "ISO Week", "Building", "Bird"],
+                delta=delta, partition_col="ISO Year", layout=layout, compression=compression)
+    season_rows = [{
+        "Year": year,
+        "Season": season,
+        "Building": address,
+        "Bird": bird,
+        "Count": count
+    } for ((year, season), address, bird), count in sorted(season_counts.items())]
+    write_table(season_rows, ["Year", "Season", "Building", "Bird", "Count"], f"{output_prefix}_season_counts.csv",
+                key_cols=["Year", "Season", "Building", "Bird"], delta=delta, partition_col="Year", layout=layout,
+                compression=compression)
+    stats.count_rows("write_date_counts", len(daily_rows) + len(weekly_rows) + len(season_rows))
 
 
 def main(input_fi: str, year: int, output_stub: str) -> None:
@@ -265,10 +460,11 @@ def main(input_fi: str, year: int, output_stub: str) -> None:
     :param output_stub: Prefix for output files
     :return: None
     """
-    cleaned_rows, address_to_bird, bird_counts = get_cleaned_data(input_fi, year)
+    cleaned_rows, address_to_bird, bird_counts, date_counts = get_cleaned_data(input_fi, year)
     write_clean_sheet(cleaned_rows, output_stub)
     write_address_counts(address_to_bird, output_stub)
     write_bird_counts(bird_counts, output_stub)
+    write_date_counts(date_counts, output_stub)
 
 
 def get_year(filename: str) -> int:
@@ -1,37 +1,214 @@
 import argparse
+import asyncio
 import os
+import time
+
+import outputs
+import stats
 
 from pathlib import Path
-from pydantic.utils import deep_update
-from clean_data import get_cleaned_data, write_clean_sheet, write_address_counts, write_bird_counts, get_year
+from clean_data import count_row, get_cleaned_data, write_clean_sheet, write_address_counts, write_bird_counts, \
+    write_date_counts, get_year
+from dedup import CONFLICT_COLS, drop_duplicates
+from outputs import COMPRESSION_SUFFIXES, FLAT_LAYOUT, LAYOUTS, write_table
 
 
-def write_data(input_dir: str, output_dir: str) -> None:
+def get_input_files(input_dir: str) -> dict:
     """
-    Clean and write out all years of data in a directory
+    Find the raw data files in a directory
     :param input_dir: Directory containing raw data
+    :return: Dict mapping each file's path to its (modification time, size), which changes when the file does
+    """
+    input_files = {}
+    for entry in os.scandir(input_dir):
+        # skip hidden files and the lock files Excel leaves next to open workbooks
+        if entry.name.startswith(".") or entry.name.startswith("~$"):
+            continue
+        try:
+            if not entry.is_file():
+                continue
+            stat = entry.stat()
+        except FileNotFoundError:
+            # deleted since the directory was listed
+            continue
+        input_files[Path(entry.path)] = (stat.st_mtime_ns, stat.st_size)
+    return input_files
+
+
+@stats.timed("merge")
+def merge_cleaned_data(results: list) -> tuple:
+    """
+    Combine the cleaned rows of several files and count them
+    :param results: List of (input file, year, cleaned rows) tuples
+    :return: Tuple of combined cleaned rows, year of each cleaned row, address to bird counts, bird counts, and date
+        to address to bird counts
+    """
+    cleaned_rows, years, address_to_bird, bird_counts, date_counts = [], [], {}, {}, {}
+    for _, year, curr_cleaned_rows in results:
+        cleaned_rows.extend(curr_cleaned_rows)
+        years.extend([year] * len(curr_cleaned_rows))
+        for row in curr_cleaned_rows:
+            count_row(row, year, address_to_bird, bird_counts, date_counts)
+        stats.count_rows("merge", len(curr_cleaned_rows))
+    return cleaned_rows, years, address_to_bird, bird_counts, date_counts
+
+
+def write_outputs(results: list, output_dir: str, delta: bool = False, keep_duplicates: bool = False,
+                  layout: str = FLAT_LAYOUT, compression: str = None) -> None:
+    """
+    Merge and write out cleaned data for all years
+    :param results: List of (input file, year, cleaned rows) tuples
     :param output_dir: Directory where output files should be written
+    :param delta: If true, also write the rows of each output that changed since the last delta run
+    :param keep_duplicates: If true, keep rows that duplicate rows from other files
+    :param layout: "flat" to write each output to a single csv, or "partitioned" to write outputs with a year column
+        as a directory of files per year
+    :param compression: Compression to apply to the output files, if any ("gzip" or "zstd")
     :return: None
     """
     output_stub = Path(output_dir) / "all_years"
-    cleaned_rows, address_to_bird, bird_counts = [], {}, {}
-    for fi in os.listdir(input_dir):
-        if fi.startswith("."):
+    if not keep_duplicates:
+        results, num_duplicates, conflicts = drop_duplicates(results)
+        if num_duplicates:
+            print(f"Dropped {num_duplicates} rows that duplicate rows from other files")
+        if conflicts:
+            print(f"Kept {len(conflicts) // 2} rows that share a CW Number with a row from another file but differ "
+                  f"otherwise")
+        write_table(conflicts, CONFLICT_COLS, f"{output_stub}_duplicate_conflicts.csv", compression=compression)
+    cleaned_rows, years, address_to_bird, bird_counts, date_counts = merge_cleaned_data(results)
+    write_clean_sheet(cleaned_rows, output_stub, delta, layout, compression, years)
+    write_address_counts(address_to_bird, output_stub, delta, layout, compression)
+    write_bird_counts(bird_counts, output_stub, delta, layout, compression)
+    write_date_counts(date_counts, output_stub, delta, layout, compression)
+
+
+def clean_file(input_fi: Path) -> tuple:
+    """
+    Clean a raw data file
+    :param input_fi: File containing raw data
+    :return: Tuple of the file, its year, and its cleaned rows
+    """
+    year = get_year(input_fi.name)
+    # rows are counted once they have been merged with, and deduplicated against, the other files
+    cleaned_rows, _, _, _ = get_cleaned_data(input_fi, year, count=False)
+    return input_fi, year, cleaned_rows
+
+
+@stats.timed("write_data")
+def write_data(input_dir: str, output_dir: str, delta: bool = False, keep_duplicates: bool = False,
+               layout: str = FLAT_LAYOUT, compression: str = None) -> None:
+    """
+    Clean and write out all years of data in a directory
+    :param input_dir: Directory containing raw data
+    :param output_dir: Directory where output files should be written
+    :param delta: If true, also write the rows of each output that changed since the last delta run
+    :param keep_duplicates: If true, keep rows that duplicate rows from other files
+    :param layout: "flat" or "partitioned"; see `write_outputs`
+    :param compression: Compression to apply to the output files, if any ("gzip" or "zstd")
+    :return: None
+    """
+    results = [clean_file(fi) for fi in sorted(get_input_files(input_dir))]
+    write_outputs(results, output_dir, delta, keep_duplicates, layout, compression)
+    stats.count_rows("write_data", sum(len(rows) for _, _, rows in results))
+
+
+async def watch_data(input_dir: str, output_dir: str, poll_interval: float, debounce: float,
+                     delta: bool = False, keep_duplicates: bool = False, stats_fi: str = None,
+                     layout: str = FLAT_LAYOUT, compression: str = None) -> None:
+    """
+    Watch a directory for new, changed, or deleted raw data files, and rewrite the outputs after each change.
+    Only changed files are re-cleaned; the cleaned data from other files, along with the compiled rules and
+    normalization caches, stays in memory between changes
+    :param input_dir: Directory containing raw data
+    :param output_dir: Directory where output files should be written
+    :param poll_interval: Seconds between checks of the directory for changes
+    :param debounce: Seconds the directory must go without changes before the outputs are rewritten, so that a
+        burst of uploads is handled at once
+    :param delta: If true, also write the rows of each output that changed since the last rewrite
+    :param keep_duplicates: If true, keep rows that duplicate rows from other files
+    :param stats_fi: If specified, file where stats for each rewrite are written, if stats are enabled
+    :param layout: "flat" or "partitioned"; see `write_outputs`. With "partitioned", only the files of years whose
+        rows changed are rewritten
+    :param compression: Compression to apply to the output files, if any ("gzip" or "zstd")
+    :return: None
+    """
+    # maps each file to its (modification time, size) when it was cleaned and the output of `clean_file`
+    results = {}
+    while True:
+        input_files = get_input_files(input_dir)
+        if input_files == {fi: version for fi, (version, _) in results.items()}:
+            await asyncio.sleep(poll_interval)
             continue
-        year = get_year(fi)
-        curr_cleaned_rows, curr_address_to_bird, curr_bird_counts = get_cleaned_data(Path(input_dir) / fi, year)
-        cleaned_rows.extend(curr_cleaned_rows)
-        address_to_bird = deep_update(address_to_bird, curr_address_to_bird)
-        bird_counts = deep_update(bird_counts, curr_bird_counts)
-    write_clean_sheet(cleaned_rows, output_stub)
-    write_address_counts(address_to_bird, output_stub)
-    write_bird_counts(bird_counts, output_stub)
+        # wait for uploads to finish
+        while True:
+            await asyncio.sleep(debounce)
+            latest_input_files = get_input_files(input_dir)
+            if latest_input_files == input_files:
+                break
+            input_files = latest_input_files
+        start = time.perf_counter()
+        if stats_fi:
+            stats.reset()
+        for fi in set(results) - set(input_files):
+            print(f"Removed {fi}")
+            del results[fi]
+        for fi, version in sorted(input_files.items()):
+            if (fi in results) and (results[fi][0] == version):
+                continue
+            try:
+                result = await asyncio.to_thread(clean_file, fi)
+                print(f"Cleaned {fi}")
+            except Exception as e:
+                # keep the file's previous data, if any, until it is changed again
+                print(f"Warning, could not clean {fi}: {e}")
+                result = results[fi][1] if fi in results else (fi, None, [])
+            results[fi] = (version, result)
+        try:
+            await asyncio.to_thread(write_outputs, [results[fi][1] for fi in sorted(results)], output_dir, delta,
+                                    keep_duplicates, layout, compression)
+            print(f"Rewrote outputs in {time.perf_counter() - start:.2f}s")
+        except Exception as e:
+            # keep watching; the outputs are rewritten after the next change
+            print(f"Warning, could not rewrite outputs: {e}")
+        if stats_fi:
+            stats.write_stats(stats_fi)
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--input_dir", default="LODC_spreadsheets")
     parser.add_argument("--output_dir", default="LODC_clean")
+    parser.add_argument("--watch", action="store_true", help="Keep running, rewriting outputs when inputs change")
+    parser.add_argument("--poll_interval", type=float, default=0.2,
+                        help="In watch mode, seconds between checks for changed inputs")
+    parser.add_argument("--debounce", type=float, default=0.2,
+                        help="In watch mode, seconds inputs must stay unchanged before outputs are rewritten")
+    parser.add_argument("--delta", action="store_true",
+                        help="Also write the rows of each output that were added, removed or changed since the last "
+                             "run with --delta")
+    parser.add_argument("--keep_duplicates", action="store_true",
+                        help="Keep rows that duplicate rows from other files, rather than dropping them")
+    parser.add_argument("--layout", choices=LAYOUTS, default=FLAT_LAYOUT,
+                        help="With partitioned, write each output with a year column as a directory of files per "
+                             "year, like all_years_clean/year=2019/part.csv, with a _manifest.json")
+    parser.add_argument("--compression", choices=list(COMPRESSION_SUFFIXES),
+                        help="Compress output files as they are written (zstd requires the zstandard package)")
+    parser.add_argument("--stats", help="Write timings and row counts for each stage of the run to this json file")
+    parser.add_argument("--trace_memory", action="store_true",
+                        help="With --stats, also record the peak memory of each stage (slows the run down)")
     args = parser.parse_args()
+    if args.delta and ((args.layout != FLAT_LAYOUT) or args.compression):
+        parser.error("--delta is only supported for uncompressed flat outputs")
+    if (args.compression == "zstd") and (outputs.zstandard is None):
+        parser.error("--compression zstd requires the zstandard package")
 
-    write_data(args.input_dir, args.output_dir)
+    if args.stats:
+        stats.enable(args.trace_memory)
+    if args.watch:
+        asyncio.run(watch_data(args.input_dir, args.output_dir, args.poll_interval, args.debounce, args.delta,
+                               args.keep_duplicates, args.stats, args.layout, args.compression))
+    else:
+        write_data(args.input_dir, args.output_dir, args.delta, args.keep_duplicates, args.layout,
+                   args.compression)
+        if args.stats:
+            stats.write_stats(args.stats)
@@ -1,7 +1,8 @@
 CLEAN_SHEET_COLS = ["Date", "Bird Species, if known", "Clean Bird Species", "Sex, if known",
                                      "Address where found", "Clean Address", "CW Number", "Disposition",
                                      "Status: Released-- Nearest address/landmark", "Last Name", "What route?",
-                                     "Status", "Approx. time you found the bird"]
+                                     "Status", "Approx. time you found the bird", "Cell Shading"]
+SHADING_COL = "Cell Shading"
 UNKNOWN_ADDRESS = "Unknown"
 AUDI = "100 Potomac Ave SW"
 CUA = "620 Michigan Ave NE"
@@ -486,6 +487,11 @@ ALT_ADDR_COLS = [DEFAULT_ADDR_COL, "Chinatown Route: Closest Address", "Union St
 DEFAULT_BIRD_COL = "Bird Species, if known"
 ALT_BIRD_COLS = [DEFAULT_BIRD_COL, "Species", "species", "Bird Species"]
 UNKNOWN_DATE = "Unknown"
+DATE_COLS = ["Date", "date", "Date Jotform (MMDDYYYY)"]
+# First and last months of each migration season, inclusive. Dates outside these are in OTHER_SEASON
+MIGRATION_SEASONS = [("Spring", 3, 6), ("Fall", 8, 11)]
+OTHER_SEASON = "Other"
 NEEDS_NW = ["Massachusetts Ave", "I St", "Palmer Alley", "New York Ave", "New Jersey Ave",
             "Wisconsin Ave", "901 4th St", "21 Dupont Circle", "Benton St", "1026 6th St", "1050 K St",
             "1201 15th St", "15th and L St", "441 4th St"]
+NEEDS_NE = ["1701 Rhode Island Ave"]
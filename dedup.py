@@ -0,0 +1,95 @@
+import stats
+
+from constants import CLEAN_SHEET_COLS
+
+# Columns used to match rows when a CW Number isn't available on both sides
+FINGERPRINT_COLS = ["Date", "Clean Bird Species", "Clean Address", "Approx. time you found the bird"]
+CONFLICT_COLS = ["Key", "File"] + CLEAN_SHEET_COLS
+
+
+def normalize_value(value: str) -> str:
+    """
+    Normalize a value for comparison, ignoring case and whitespace
+    :param value: Value from a cleaned row
+    :return: Normalized value
+    """
+    return " ".join((value or "").lower().split())
+
+
+def get_fingerprint(row: dict, year: int) -> tuple:
+    """
+    Get the fingerprint of a cleaned row
+    :param row: Cleaned row
+    :param year: Year of the row's data
+    :return: Tuple of the year and the row's normalized date, bird, address, and time found
+    """
+    return (year,) + tuple(normalize_value(row.get(col)) for col in FINGERPRINT_COLS)
+
+
+def find_match(index: tuple, key: tuple, input_fi: str) -> list:
+    """
+    Find the first indexed row with a key that is from a different file and hasn't already been matched by a row
+    of `input_fi`. Each file keeps a cursor into the rows with each key, so that rows it can't match are only
+    checked once
+    :param index: Tuple of a dict mapping keys to lists of entries, and a dict mapping (key, file) to cursors
+    :param key: Key of the row being matched
+    :param input_fi: File of the row being matched
+    :return: Matching [file, row, files the row has been matched from] entry, if any
+    """
+    entries, cursors = index
+    candidates = entries.get(key, [])
+    idx = cursors.get((key, input_fi), 0)
+    while (idx < len(candidates)) and ((candidates[idx][0] == input_fi) or (input_fi in candidates[idx][2])):
+        idx += 1
+    if idx == len(candidates):
+        cursors[(key, input_fi)] = idx
+        return None
+    cursors[(key, input_fi)] = idx + 1
+    return candidates[idx]
+
+
+@stats.timed("drop_duplicates")
+def drop_duplicates(results: list) -> tuple:
+    """
+    Drop rows of one file that duplicate rows of another, e.g. when a year's data is in both route sheets and a
+    master sheet. Rows are matched on CW Number when both rows have one, and otherwise on their fingerprint (date,
+    bird, address, and time found). Each row can be matched by at most one row from each other file, so repeated
+    rows within a file, like two birds of the same species found at the same building, are kept. Rows that match on
+    CW Number but have different fingerprints may be different birds, so both are kept, and reported as conflicts
+    :param results: List of (input file, year, cleaned rows) tuples
+    :return: Tuple of list of (input file, year, cleaned rows) tuples without duplicates, number of rows dropped,
+        and list of rows involved in conflicts
+    """
+    # the fingerprints of rows without a CW Number are indexed separately, for matching rows that have one
+    cw_index, fingerprint_index, no_cw_fingerprint_index = ({}, {}), ({}, {}), ({}, {})
+    deduped_results, conflicts = [], []
+    num_duplicates = 0
+    for input_fi, year, rows in results:
+        kept_rows = []
+        for row in rows:
+            cw_number = normalize_value(row.get("CW Number"))
+            fingerprint = get_fingerprint(row, year)
+            match = find_match(cw_index, (year, cw_number), input_fi) if cw_number else None
+            if (match is not None) and (get_fingerprint(match[1], year) != fingerprint):
+                match[2].add(input_fi)
+                key = f"CW Number {cw_number} ({year})"
+                conflicts.append({"Key": key, "File": str(match[0]), **match[1]})
+                conflicts.append({"Key": key, "File": str(input_fi), **row})
+                match = None
+            if match is None:
+                match = find_match(no_cw_fingerprint_index if cw_number else fingerprint_index, fingerprint,
+                                   input_fi)
+            if match is not None:
+                match[2].add(input_fi)
+                num_duplicates += 1
+                continue
+            entry = [input_fi, row, set()]
+            if cw_number:
+                cw_index[0].setdefault((year, cw_number), []).append(entry)
+            else:
+                no_cw_fingerprint_index[0].setdefault(fingerprint, []).append(entry)
+            fingerprint_index[0].setdefault(fingerprint, []).append(entry)
+            kept_rows.append(row)
+        deduped_results.append((input_fi, year, kept_rows))
+        stats.count_rows("drop_duplicates", len(rows))
+    return deduped_results, num_duplicates, conflicts
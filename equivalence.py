@@ -0,0 +1,228 @@
+import argparse
+import contextlib
+import importlib
+import io
+import os
+import random
+import sys
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable
+
+from constants import ADDRESS_REPLACEMENTS, ALT_ADDR_COLS, ALT_BIRD_COLS, ALWAYS_SUBS, BIRD_REPLACEMENTS, \
+    BIRD_SUBSTRING_MAPPINGS, DATE_COLS, DIRECTIONS, NEEDS_NE, NEEDS_NW, PRE_CLEAN_ADDRESS_REPLACEMENTS
+from ingest import iter_rows
+
+NORMALIZERS = ["clean_address", "clean_bird", "clean_date_value"]
+# Columns whose raw values are inputs to each normalizer
+NORMALIZER_COLS = {"clean_address": ALT_ADDR_COLS, "clean_bird": ALT_BIRD_COLS, "clean_date_value": DATE_COLS}
+# Variations of raw values like those seen in volunteer sheets
+PERTURBATIONS = [
+    str.lower,
+    str.upper,
+    str.title,
+    lambda v: f"  {v} ",
+    lambda v: v.replace(" ", "  "),
+    lambda v: v.replace(" ", "\n", 1),
+    lambda v: v.replace(" ", ", ", 1),
+    lambda v: v.replace("St", "St."),
+    lambda v: v.replace(" and ", " & "),
+    lambda v: f"{v}, Washington, DC 20001",
+    lambda v: f"{v}, nw",
+    lambda v: f"{v} NE",
+    lambda v: f"Glass entry, {v}",
+    lambda v: f"{v} (north side)",
+    lambda v: f"{v} - east side",
+    lambda v: f"{v} #2",
+    lambda v: f"{v} (m)",
+    lambda v: f"{v} sp.",
+    lambda v: f"{v} 2",
+    lambda v: f"{v} or Sparrow",
+    lambda v: f"{v}?",
+]
+DATE_SEEDS = ["9/1/19", "09/01/2019", "9-1-2019", "9-30--2018", "10//28/20", "1/1/22", "12/12", "2019", "",
+              "9/1/19/1", "Sept 1", " 9/1/19 "]
+FUZZ_PUNCTUATION = [",", ".", "&", "(", ")", "-", "/", "#", ";", "?", "'", ":", "\n", "  "]
+
+
+def get_rule_corpus() -> dict:
+    """
+    Get raw values built from the rule tables in constants.py and perturbations of them
+    :return: Dict mapping each normalizer to a set of raw values
+    """
+    addresses = set(NEEDS_NW + NEEDS_NE + DIRECTIONS)
+    for table in [ADDRESS_REPLACEMENTS, PRE_CLEAN_ADDRESS_REPLACEMENTS, ALWAYS_SUBS]:
+        for s_from, s_to in table:
+            addresses.update([s_from.strip("^"), s_to])
+    birds = set()
+    for table in [BIRD_REPLACEMENTS, BIRD_SUBSTRING_MAPPINGS]:
+        for s_from, s_to in table:
+            birds.update([s_from, s_to])
+    corpus = {"clean_address": addresses, "clean_bird": birds, "clean_date_value": set(DATE_SEEDS)}
+    for normalizer, values in corpus.items():
+        values.update([perturb(value) for value in list(values) for perturb in PERTURBATIONS])
+    return corpus
+
+
+def get_sheet_corpus(input_dir: str) -> dict:
+    """
+    Get the distinct raw values in each column of the sheets in a directory that is an input to a normalizer
+    :param input_dir: Directory containing raw data
+    :return: Dict mapping each normalizer to a set of raw values
+    """
+    corpus = {normalizer: set() for normalizer in NORMALIZERS}
+    for fi in sorted(os.listdir(input_dir)):
+        if fi.startswith(".") or fi.startswith("~$"):
+            continue
+        rows = iter_rows(os.path.join(input_dir, fi))
+        header = next(rows, [])
+        col_idxs = {normalizer: [idx for idx, col in enumerate(header) if col in cols]
+                    for normalizer, cols in NORMALIZER_COLS.items()}
+        for row in rows:
+            for normalizer, idxs in col_idxs.items():
+                corpus[normalizer].update(row[idx] for idx in idxs if (idx < len(row)) and row[idx])
+    return corpus
+
+
+def get_fuzz_corpus(corpus: dict, num_values: int, seed: int) -> dict:
+    """
+    Generate random raw values by combining words from an existing corpus with punctuation and case changes
+    :param corpus: Dict mapping each normalizer to a set of raw values to take words from
+    :param num_values: Number of values to generate for each normalizer
+    :param seed: Random seed, so that the generated values can be reproduced
+    :return: Dict mapping each normalizer to a set of raw values
+    """
+    rand = random.Random(seed)
+    fuzz_corpus = {}
+    for normalizer, values in corpus.items():
+        words = sorted({word for value in values for word in value.split()}) or ["a"]
+        fuzz_values = set()
+        for _ in range(num_values):
+            tokens = [rand.choice(words) if rand.random() < 0.8 else rand.choice(FUZZ_PUNCTUATION)
+                      for _ in range(rand.randint(1, 8))]
+            value = (" " if rand.random() < 0.8 else "").join(tokens)
+            fuzz_values.add(rand.choice([str.lower, str.upper, str.title, str])(value))
+        fuzz_corpus[normalizer] = fuzz_values
+    return fuzz_corpus
+
+
+def get_outcome(fn: Callable, value: str) -> tuple:
+    """
+    Run a normalizer, capturing its output, or the type of exception it raised
+    :param fn: Normalizer
+    :param value: Raw value
+    :return: Tuple of ("ok", output) or ("error", exception type name)
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        try:
+            return "ok", fn(value)
+        except Exception as e:
+            return "error", type(e).__name__
+
+
+def get_normalizers(normalizer: str, candidate: str) -> tuple:
+    """
+    Get the legacy and candidate versions of a normalizer
+    :param normalizer: Name of the normalizer
+    :param candidate: Name of the module containing the candidate version
+    :return: Tuple of the legacy and candidate functions
+    """
+    return getattr(importlib.import_module("legacy_clean"), normalizer), \
+        getattr(importlib.import_module(candidate), normalizer)
+
+
+def compare_values(normalizer: str, candidate: str, values: list) -> list:
+    """
+    Compare the legacy and candidate versions of a normalizer on a list of values
+    :param normalizer: Name of the normalizer
+    :param candidate: Name of the module containing the candidate version
+    :param values: Raw values
+    :return: List of values for which the outputs differ
+    """
+    legacy_fn, candidate_fn = get_normalizers(normalizer, candidate)
+    return [value for value in values if get_outcome(legacy_fn, value) != get_outcome(candidate_fn, value)]
+
+
+def shrink(value: str, legacy_fn: Callable, candidate_fn: Callable) -> str:
+    """
+    Find a minimal input on which two normalizers still differ, by repeatedly deleting runs of characters,
+    halving the length of the runs each time no more can be deleted
+    :param value: Input on which the normalizers differ
+    :param legacy_fn: Legacy normalizer
+    :param candidate_fn: Candidate normalizer
+    :return: Shortest input found on which the normalizers differ
+    """
+    run_length = max(len(value) // 2, 1)
+    while run_length >= 1:
+        idx = 0
+        while idx < len(value):
+            smaller = value[:idx] + value[idx+run_length:]
+            if get_outcome(legacy_fn, smaller) != get_outcome(candidate_fn, smaller):
+                value = smaller
+            else:
+                idx += run_length
+        run_length //= 2
+    return value
+
+
+def find_divergences(corpus: dict, candidate: str = "clean_data", num_workers: int = 1,
+                     chunk_size: int = 1000) -> list:
+    """
+    Compare the legacy and candidate versions of each normalizer on every distinct value in a corpus
+    :param corpus: Dict mapping each normalizer to a set of raw values
+    :param candidate: Name of the module containing the candidate normalizers
+    :param num_workers: Number of processes to compare values in
+    :param chunk_size: Number of values compared in each task sent to a process
+    :return: List of dicts describing each divergence, with the original and minimal inputs and both outputs
+    """
+    tasks = []
+    for normalizer in NORMALIZERS:
+        values = sorted(corpus.get(normalizer, []))
+        tasks.extend((normalizer, candidate, values[idx:idx+chunk_size]) for idx in range(0, len(values), chunk_size))
+    if num_workers > 1:
+        with ProcessPoolExecutor(max_workers=num_workers) as executor:
+            results = list(executor.map(compare_values, *zip(*tasks)))
+    else:
+        results = [compare_values(*task) for task in tasks]
+    divergences = []
+    for (normalizer, _, _), diverging_values in zip(tasks, results):
+        legacy_fn, candidate_fn = get_normalizers(normalizer, candidate)
+        for value in diverging_values:
+            minimal = shrink(value, legacy_fn, candidate_fn)
+            divergences.append({
+                "normalizer": normalizer,
+                "input": value,
+                "minimal_input": minimal,
+                "legacy": get_outcome(legacy_fn, minimal),
+                "candidate": get_outcome(candidate_fn, minimal),
+            })
+    return divergences
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check that optimized normalizers match the legacy ones")
+    parser.add_argument("--input_dir", help="Directory of raw sheets to take values from")
+    parser.add_argument("--candidate", default="clean_data", help="Module containing the normalizers to check")
+    parser.add_argument("--num_fuzz", type=int, default=20000, help="Number of random values per normalizer")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--num_workers", type=int, default=os.cpu_count())
+    parser.add_argument("--chunk_size", type=int, default=1000)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    corpus = get_rule_corpus()
+    if args.input_dir:
+        for normalizer, values in get_sheet_corpus(args.input_dir).items():
+            corpus[normalizer].update(values)
+    for normalizer, values in get_fuzz_corpus(corpus, args.num_fuzz, args.seed).items():
+        corpus[normalizer].update(values)
+    divergences = find_divergences(corpus, args.candidate, args.num_workers, args.chunk_size)
+    for normalizer in NORMALIZERS:
+        print(f"{normalizer}: {len(corpus[normalizer])} distinct values, "
+              f"{sum(d['normalizer'] == normalizer for d in divergences)} divergences")
+    for divergence in divergences:
+        print(f"{divergence['normalizer']}({divergence['minimal_input']!r}): legacy {divergence['legacy']}, "
+              f"candidate {divergence['candidate']} (from {divergence['input']!r})")
+    print(f"Finished in {time.perf_counter() - start:.1f}s")
+    sys.exit(1 if divergences else 0)
@@ -0,0 +1,310 @@
+import codecs
+import csv
+import datetime
+import gzip
+import itertools
+import re
+import zipfile
+
+from pathlib import Path
+from typing import Iterator
+from xml.etree import ElementTree
+
+from constants import ALT_BIRD_COLS, SHADING_COL
+
+# Number of bytes read from the start of a file to detect its encoding and delimiter
+SAMPLE_SIZE = 64 * 1024
+READ_BUFFER_SIZE = 1024 * 1024
+CANDIDATE_DELIMITERS = [",", ";", "\t", "|"]
+# Encoding to try when a file turns out not to be valid in the encoding guessed from its first bytes
+FALLBACK_ENCODINGS = {"utf-8": "cp1252", "cp1252": "latin-1"}
+# Number of rows at the top of each spreadsheet tab that are searched for the header row
+HEADER_SEARCH_ROWS = 20
+XLSX_SUFFIXES = [".xlsx", ".xlsm"]
+# Blanket white fills are treated as no shading
+WHITE = "#FFFFFF"
+GZIP_SUFFIX = ".gz"
+ODS_NS = {
+    "office": "urn:oasis:names:tc:opendocument:xmlns:office:1.0",
+    "style": "urn:oasis:names:tc:opendocument:xmlns:style:1.0",
+    "table": "urn:oasis:names:tc:opendocument:xmlns:table:1.0",
+    "text": "urn:oasis:names:tc:opendocument:xmlns:text:1.0",
+    "fo": "urn:oasis:names:tc:opendocument:xmlns:xsl-fo-compatible:1.0",
+}
+
+
+def detect_encoding(sample: bytes) -> str:
+    """
+    Guess the encoding of a file from a sample of its first bytes
+    :param sample: Bytes from the start of the file
+    :return: Name of the encoding
+    """
+    if sample.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    if sample.startswith(codecs.BOM_UTF16_LE) or sample.startswith(codecs.BOM_UTF16_BE):
+        return "utf-16"
+    try:
+        # the sample may end partway through a multibyte character, so don't treat it as the end of input
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        pass
+    try:
+        sample.decode("cp1252")
+        return "cp1252"
+    except UnicodeDecodeError:
+        return "latin-1"
+
+
+def can_decode(input_fi: str, encoding: str) -> bool:
+    """
+    Check whether a whole file is valid in an encoding
+    :param input_fi: File containing raw data
+    :param encoding: Name of the encoding
+    :return: True if the file decodes without errors
+    """
+    decoder = codecs.getincrementaldecoder(encoding)()
+    with open_csv(input_fi) as f:
+        try:
+            for chunk in iter(lambda: f.read(READ_BUFFER_SIZE), b""):
+                decoder.decode(chunk)
+            decoder.decode(b"", final=True)
+        except UnicodeDecodeError:
+            return False
+    return True
+
+
+def detect_file_encoding(input_fi: str, sample: bytes) -> str:
+    """
+    Guess the encoding of a file from a sample of its first bytes, then check the guess against the whole file,
+    since the first character that tells encodings apart may come after the sample
+    :param input_fi: File containing raw data
+    :param sample: Bytes from the start of the file
+    :return: Name of the encoding
+    """
+    encoding = detect_encoding(sample)
+    if len(sample) < SAMPLE_SIZE:
+        # the sample is the whole file
+        return encoding
+    while (encoding in FALLBACK_ENCODINGS) and not can_decode(input_fi, encoding):
+        encoding = FALLBACK_ENCODINGS[encoding]
+    return encoding
+
+
+def detect_delimiter(sample: str) -> str:
+    """
+    Guess the delimiter of a csv from its header line
+    :param sample: Decoded text from the start of the file
+    :return: The most frequent candidate delimiter in the header, defaulting to a comma
+    """
+    lines = sample.splitlines()
+    header = lines[0] if lines else ""
+    delimiter = max(CANDIDATE_DELIMITERS, key=header.count)
+    return delimiter if header.count(delimiter) else ","
+
+
+def iter_rows(input_fi: str) -> Iterator:
+    """
+    Iterate over the rows of a raw data sheet, which may be a csv, gzipped csv, xlsx or ods file
+    :param input_fi: File containing raw data
+    :return: Iterator over rows, each a list or tuple of values. The first row is the header
+    """
+    suffix = Path(input_fi).suffix.lower()
+    if suffix in XLSX_SUFFIXES:
+        yield from iter_data_sheet_rows(iter_xlsx_sheets(input_fi), input_fi)
+    elif suffix == ".ods":
+        yield from iter_data_sheet_rows(iter_ods_sheets(input_fi), input_fi)
+    else:
+        yield from iter_csv_rows(input_fi)
+
+
+def open_csv(input_fi: str, encoding: str = None, buffering: int = -1):
+    """
+    Open a csv, decompressing it as it is read if it is gzipped
+    :param input_fi: File containing raw data
+    :param encoding: Encoding of the file, or None to open it in binary mode
+    :param buffering: Buffer size, for uncompressed files
+    :return: Open file
+    """
+    mode = "rt" if encoding else "rb"
+    newline = "" if encoding else None
+    if Path(input_fi).suffix.lower() == GZIP_SUFFIX:
+        return gzip.open(input_fi, mode=mode, encoding=encoding, newline=newline)
+    return open(input_fi, mode=mode, encoding=encoding, newline=newline, buffering=buffering)
+
+
+def iter_csv_rows(input_fi: str) -> Iterator:
+    """
+    Iterate over the rows of a csv. The encoding and delimiter are detected once per file
+    :param input_fi: File containing raw data
+    :return: Iterator over rows, each a list or tuple of values. The first row is the header
+    """
+    with open_csv(input_fi) as f:
+        sample = f.read(SAMPLE_SIZE)
+    encoding = detect_file_encoding(input_fi, sample)
+    # decode with the incremental decoder so a truncated trailing character doesn't raise
+    delimiter = detect_delimiter(codecs.getincrementaldecoder(encoding)(errors="replace").decode(sample))
+    with open_csv(input_fi, encoding, READ_BUFFER_SIZE) as f:
+        yield from csv.reader(f, delimiter=delimiter)
+
+
+def iter_data_sheet_rows(sheets: Iterator, input_fi: str) -> Iterator:
+    """
+    Find the tab of a spreadsheet that contains the data, which is the first one with a bird column in its
+    first few rows, and iterate over its rows. Rows above the header, such as titles, are skipped
+    :param sheets: Iterator over tabs, each an iterator over rows of (value, shading) tuples
+    :param input_fi: File the tabs were read from
+    :return: Iterator over rows, each a list of values followed by the row's shading. The first row is the header
+    """
+    for sheet in sheets:
+        for row in itertools.islice(sheet, HEADER_SEARCH_ROWS):
+            header = [value for value, _ in row]
+            if any(col in ALT_BIRD_COLS for col in header):
+                yield header + [SHADING_COL]
+                for data_row in sheet:
+                    values = [value for value, _ in data_row[:len(header)]]
+                    values += [""] * (len(header) - len(values))
+                    yield values + [next((s for _, s in data_row if s), "")]
+                return
+    print(f"Warning, no tab with a bird column in {input_fi}")
+
+
+def format_cell_value(value) -> str:
+    """
+    Convert a spreadsheet cell value into the string it would have in a csv export
+    :param value: Value of the cell
+    :return: String version of the value, with dates formatted as MM/DD/YYYY
+    """
+    if value is None:
+        return ""
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return f"{value.month:02}/{value.day:02}/{value.year}"
+    if isinstance(value, datetime.time):
+        return value.strftime("%H:%M")
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def get_xlsx_shading(cell) -> str:
+    """
+    Get the background color of a solid-filled xlsx cell
+    :param cell: openpyxl cell
+    :return: Color as "#RRGGBB", or a theme/indexed color reference, if the cell is shaded a color other than white
+    """
+    fill = getattr(cell, "fill", None)
+    if (fill is None) or (fill.fill_type != "solid"):
+        return ""
+    color = fill.fgColor
+    if color.type == "rgb":
+        color = f"#{color.rgb[-6:]}".upper()
+        return "" if color == WHITE else color
+    return f"{color.type} {color.value}"
+
+
+def iter_xlsx_sheets(input_fi: str) -> Iterator:
+    """
+    Stream the tabs of an xlsx workbook without loading it into memory
+    :param input_fi: xlsx file
+    :return: Iterator over tabs, each an iterator over rows of (value, shading) tuples
+    """
+    # imported here so that reading csvs doesn't pay for loading openpyxl
+    try:
+        import openpyxl
+    except ImportError:
+        raise ImportError(f"openpyxl is required to read {input_fi}")
+    workbook = openpyxl.load_workbook(input_fi, read_only=True, data_only=True)
+    try:
+        for sheet in workbook.worksheets:
+            yield ([(format_cell_value(cell.value), get_xlsx_shading(cell)) for cell in row]
+                   for row in sheet.iter_rows())
+    finally:
+        workbook.close()
+
+
+def ods_attr(elem: ElementTree.Element, name: str) -> str:
+    """
+    Get a namespaced attribute of an OpenDocument element
+    :param elem: Element
+    :param name: Attribute name, like "table:style-name"
+    :return: Attribute value, if present
+    """
+    prefix, local = name.split(":")
+    return elem.get(f"{{{ODS_NS[prefix]}}}{local}")
+
+
+def format_ods_cell(cell: ElementTree.Element) -> str:
+    """
+    Convert an ods cell into the string it would have in a csv export
+    :param cell: table:table-cell element
+    :return: String version of the cell's value, with dates formatted as MM/DD/YYYY
+    """
+    value_type = ods_attr(cell, "office:value-type")
+    if value_type == "date":
+        return format_cell_value(datetime.date.fromisoformat(ods_attr(cell, "office:date-value")[:10]))
+    if value_type == "time":
+        hours, minutes = re.match(r"PT(\d+)H(\d+)M", ods_attr(cell, "office:time-value")).groups()
+        return f"{int(hours):02}:{int(minutes):02}"
+    if value_type in ["float", "percentage", "currency"]:
+        return format_cell_value(float(ods_attr(cell, "office:value")))
+    return "\n".join("".join(p.itertext()) for p in cell.iter(f"{{{ODS_NS['text']}}}p"))
+
+
+def iter_ods_rows(input_fi: str) -> Iterator:
+    """
+    Stream the rows of all tabs of an ods workbook with iterparse, so only one row is held in memory at a time
+    :param input_fi: ods file
+    :return: Iterator over (tab number, row) tuples, each row a list of (value, shading) tuples
+    """
+    style_tag = f"{{{ODS_NS['style']}}}style"
+    table_tag = f"{{{ODS_NS['table']}}}table"
+    row_tag = f"{{{ODS_NS['table']}}}table-row"
+    cell_tags = [f"{{{ODS_NS['table']}}}table-cell", f"{{{ODS_NS['table']}}}covered-table-cell"]
+    shading = {}
+    sheet_num = 0
+    with zipfile.ZipFile(input_fi) as zf, zf.open("content.xml") as f:
+        for event, elem in ElementTree.iterparse(f, events=["end"]):
+            if elem.tag == style_tag:
+                props = elem.find("style:table-cell-properties", ODS_NS)
+                color = ods_attr(props, "fo:background-color") if props is not None else None
+                if color and (color.upper() not in ["TRANSPARENT", WHITE]):
+                    shading[ods_attr(elem, "style:name")] = color.upper()
+            elif elem.tag == table_tag:
+                sheet_num += 1
+                elem.clear()
+            elif elem.tag == row_tag:
+                row = []
+                # repeated empty cells, shaded or not, are only added once a non-empty cell follows them, so the
+                # long runs of blank cells that pad out each row aren't materialized
+                pending_empty = []
+                for cell in elem:
+                    if cell.tag not in cell_tags:
+                        continue
+                    value = (format_ods_cell(cell), shading.get(ods_attr(cell, "table:style-name"), ""))
+                    num_repeated = int(ods_attr(cell, "table:number-columns-repeated") or 1)
+                    if not value[0]:
+                        pending_empty.append((value, num_repeated))
+                    else:
+                        for empty_value, num_empty in pending_empty:
+                            row.extend([empty_value] * num_empty)
+                        row.extend([value] * num_repeated)
+                        pending_empty = []
+                # rows without values, like the styled rows that pad out the end of a tab, are skipped however
+                # many times they are repeated
+                if row:
+                    # keep the shading of trailing empty cells if the row has none otherwise
+                    if not any(s for _, s in row):
+                        row.extend(next(([empty_value] for empty_value, _ in pending_empty if empty_value[1]), []))
+                    for _ in range(int(ods_attr(elem, "table:number-rows-repeated") or 1)):
+                        yield sheet_num, row
+                elem.clear()
+
+
+def iter_ods_sheets(input_fi: str) -> Iterator:
+    """
+    Stream the tabs of an ods workbook
+    :param input_fi: ods file
+    :return: Iterator over tabs, each an iterator over rows of (value, shading) tuples
+    """
+    for _, sheet in itertools.groupby(iter_ods_rows(input_fi), key=lambda sheet_row: sheet_row[0]):
+        yield (row for _, row in sheet)
@@ -0,0 +1,96 @@
+# Reference implementations of the normalizers, kept as they were before they were optimized. They apply the rule
+# tables in constants.py directly, one entry at a time, and are used by equivalence.py to check that the optimized
+# versions in clean_data.py give the same outputs. Don't optimize these.
+import re
+
+from constants import ADDRESS_ENDINGS, ADDRESS_REPLACEMENTS, ALWAYS_SUBS, BIRD_REPLACEMENTS, \
+    BIRD_SUBSTRING_MAPPINGS, DIRECTIONS, NEEDS_NE, NEEDS_NW, PRE_CLEAN_ADDRESS_REPLACEMENTS, UNKNOWN_ADDRESS, \
+    UNKNOWN_BIRD, UNKNOWN_DATE
+
+
+def clean_address(addr: str) -> str:
+    """
+    Normalize address string
+    :param addr: address string to be normalized
+    :return: normalized address
+    """
+    if not addr:
+        return UNKNOWN_ADDRESS
+    clean = " ".join(addr.replace("\n", " ").replace("\r", " ").split())
+    for s_from, s_to in PRE_CLEAN_ADDRESS_REPLACEMENTS:
+        if clean == s_from:
+            clean = s_to
+    for s_search, s_to in ALWAYS_SUBS:
+        if re.search(s_search, clean):
+            clean = s_to
+    # fix case of directions
+    clean = clean.replace(".", "").split(";")[0].strip().replace("\n", " ")
+    clean = clean.replace("&", "and").replace(" And ", " and ")
+    for direct in DIRECTIONS:
+        clean = re.sub(rf"(?i)(\b){direct}(\b)", rf"\1{direct}\2", clean)
+        clean = clean.replace(f", {direct}", f" {direct}")
+        clean = re.sub(rf"(?i)(\b){direct} and(\b)", rf"\1and\2", clean)
+    for sep in [" - ", ",", "("]:
+        clean = clean.split(sep)[0]
+    for s_from, s_to in ADDRESS_REPLACEMENTS:
+        if s_from.startswith("^") and clean == s_from.strip("^"):
+            clean = s_to
+        else:
+            clean = clean.replace(s_from, s_to)
+    clean = re.sub(r"(?i)\s+noma(\b|$)", "", clean)
+    clean = re.sub(r"Condominium(\b)", r"Condominiums\1", clean)
+    for needs_nw in NEEDS_NW:
+        clean = re.sub(rf"{needs_nw}\s*$", f"{needs_nw} NW", clean)
+    for needs_ne in NEEDS_NE:
+        clean = re.sub(rf"{needs_ne}\s*$", f"{needs_ne} NE", clean)
+    clean = re.sub(r"NW\s*/.*", "NW", clean)
+    clean = " ".join(clean.strip().split())
+    for ending in ADDRESS_ENDINGS:
+        clean = re.sub(rf"({ending}).*", r"\1", clean)
+    clean = re.sub(r" to the right.*", "", clean)
+    clean = re.sub("-+", "-", clean)
+    clean = clean.replace("NW NW", "NW").replace("NE NE", "NE").replace("SW SW", "SW")
+    clean = re.sub(r" #.*", "", clean)
+    clean = re.sub(r" between.*", "", clean)
+    return clean if clean else UNKNOWN_ADDRESS
+
+
+def clean_bird(bird: str) -> str:
+    """
+    Normalize name of bird
+    :param bird: Original name of the bird
+    :return: Normalized name of the bird
+    """
+    bird = bird.split("(")[0].split(",")[0].title().replace("'S", "'s").strip()
+    bird = " ".join(bird.split())
+    for from_s, to_s in BIRD_SUBSTRING_MAPPINGS:
+        bird = bird.replace(from_s, to_s)
+    for from_s, to_s in BIRD_REPLACEMENTS:
+        if bird == from_s:
+            bird = to_s
+    if ("Unidentified" in bird) or ("Unknown" in bird):
+        bird = UNKNOWN_BIRD
+    bird = re.sub(r" Sp$", " Species", bird)
+    bird = re.sub(r" \d+\s*$", "", bird)
+    if " or " in bird.lower():
+        return UNKNOWN_BIRD
+    return bird.strip()
+
+
+def clean_date_value(date: str) -> str:
+    """
+    Normalize date to YYYY-MM-DD format
+    :param date: Unnormalized date
+    :return: Normalized date
+    """
+    separators = ["/", "-"]
+    for separator in separators:
+        if separator in date:
+            date_parts = [p for p in date.strip().split(separator) if p]
+    if len(date_parts) != 3:
+        print(f"Unexpected date format: {date}")
+        return UNKNOWN_DATE
+    month = date_parts[0] if len(date_parts[0]) == 2 else "0"+date_parts[0]
+    day = date_parts[1] if len(date_parts[1]) == 2 else "0"+date_parts[1]
+    year = date_parts[2] if len(date_parts[2]) == 4 else "20"+date_parts[2]
+    return f"{year}-{month}-{day}"
@@ -0,0 +1,291 @@
+import csv
+import gzip
+import hashlib
+import io
+import json
+import os
+
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Separates values when rows and keys are joined into strings, since it won't appear in the data
+VALUE_SEP = "\x1f"
+FLAT_LAYOUT = "flat"
+PARTITIONED_LAYOUT = "partitioned"
+LAYOUTS = [FLAT_LAYOUT, PARTITIONED_LAYOUT]
+# Maps each supported compression to the suffix of compressed files
+COMPRESSION_SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+MANIFEST_FI = "_manifest.json"
+UNKNOWN_PARTITION = "unknown"
+
+
+@contextmanager
+def open_output(output_fi: str, compression: str = None):
+    """
+    Open a text file for writing, compressing it as it is written
+    :param output_fi: File to write
+    :param compression: "gzip", "zstd" (requires `zstandard`), or None to write plain text
+    :return: Context manager yielding the open file
+    """
+    if not compression:
+        # the csv module handles line endings itself, including those inside quoted values
+        with open(output_fi, mode="w", encoding="utf-8", newline="") as f:
+            yield f
+        return
+    if compression not in COMPRESSION_SUFFIXES:
+        raise ValueError(f"Unknown compression {compression}")
+    if (compression == "zstd") and (zstandard is None):
+        raise ImportError(f"zstandard is required to write {output_fi}")
+    with open(output_fi, mode="wb") as f:
+        if compression == "gzip":
+            # with no file name and a fixed mtime in the header, rewriting the same rows produces the same bytes
+            stream = gzip.GzipFile(filename="", mode="wb", fileobj=f, mtime=0)
+        else:
+            stream = zstandard.ZstdCompressor().stream_writer(f, closefd=False)
+        # closing the wrapper finishes the compressed stream, then the file itself is closed
+        with io.TextIOWrapper(stream, encoding="utf-8", newline="") as text_f:
+            yield text_f
+
+
+@contextmanager
+def atomic_open(output_fi: str, compression: str = None):
+    """
+    Open a file for writing via a temporary file that replaces it on success, so that readers see either the old
+    or the complete new version of the file
+    :param output_fi: File to write
+    :param compression: Compression to apply to the file, if any; see `open_output`
+    :return: Context manager yielding the open temporary file
+    """
+    output_fi = Path(output_fi)
+    tmp_fi = output_fi.with_name(f".{output_fi.name}.{os.getpid()}.tmp")
+    try:
+        with open_output(tmp_fi, compression) as f:
+            yield f
+        os.replace(tmp_fi, output_fi)
+    except BaseException:
+        tmp_fi.unlink(missing_ok=True)
+        raise
+
+
+def write_table(rows: list, fieldnames: list, output_fi: str, key_cols: list = None, delta: bool = False,
+                partition_col: str = None, layout: str = FLAT_LAYOUT, compression: str = None,
+                partition_values: list = None) -> None:
+    """
+    Writes a list of rows to a csv
+    :param rows: List of dicts mapping column names to values
+    :param fieldnames: Columns to write
+    :param output_fi: File to write
+    :param key_cols: Columns that uniquely identify a row, if any
+    :param delta: If true, also write the changes since the last delta run; see `write_delta`. Only supported for
+        uncompressed files
+    :param partition_col: Column whose value starts with the year of the row, if any
+    :param layout: With "partitioned", tables with a `partition_col` or `partition_values` are written as a
+        directory of files per year; see `write_partitions`
+    :param compression: Compression to apply, if any; see `open_output`. The compression's suffix is added to
+        `output_fi`
+    :param partition_values: Year of each row, for tables whose rows are partitioned by something other than one
+        of their columns, like the year of the sheet they came from
+    :return: None
+    """
+    partitioned = (layout == PARTITIONED_LAYOUT) and ((partition_col is not None) or (partition_values is not None))
+    if delta and (compression or partitioned):
+        raise ValueError(f"Delta outputs are only supported for uncompressed flat files, not {output_fi}")
+    if partitioned:
+        if partition_values is None:
+            partition_values = [row.get(partition_col) for row in rows]
+        write_partitions(rows, fieldnames, Path(output_fi).with_suffix(""), partition_values, compression)
+        return
+    if compression:
+        output_fi = f"{output_fi}{COMPRESSION_SUFFIXES[compression]}"
+    index = write_delta(rows, fieldnames, output_fi, key_cols) if delta else None
+    with atomic_open(output_fi, compression) as f:
+        write_rows(f, rows, fieldnames)
+    # the index is only updated once the full output is, so an interrupted run is compared against the same state
+    if index is not None:
+        with atomic_open(get_index_fi(output_fi)) as f:
+            json.dump(index, f)
+
+
+def write_rows(f, rows: list, fieldnames: list) -> None:
+    """
+    Writes a header and rows to an open csv
+    :param f: Open file
+    :param rows: List of dicts mapping column names to values
+    :param fieldnames: Columns to write
+    :return: None
+    """
+    writer = csv.DictWriter(f, fieldnames=fieldnames)
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+
+
+def get_partition(value) -> str:
+    """
+    Get the partition of a row from the value of its partition column
+    :param value: Year, or a value starting with a year, like an ISO date
+    :return: Four-digit year, or "unknown" if the value doesn't start with one
+    """
+    year = str(value or "")[:4]
+    return year if (len(year) == 4) and year.isdigit() else UNKNOWN_PARTITION
+
+
+def write_partitions(rows: list, fieldnames: list, output_dir: str, partition_values: list,
+                     compression: str = None) -> None:
+    """
+    Writes a table as one csv per year, like `all_years_clean/year=2019/part.csv.gz`, so that readers can load
+    only the years they need, in parallel. A manifest, `_manifest.json`, lists each partition's file, number of
+    rows, and a hash of its rows. Partitions whose hash, columns and compression match the previous manifest are
+    not rewritten, and partitions that no longer have rows are removed. The manifest is written last, so it only
+    lists complete files
+    :param rows: List of dicts mapping column names to values
+    :param fieldnames: Columns to write
+    :param output_dir: Directory to write the table to
+    :param partition_values: Year of each row, or a value starting with it, like an ISO date
+    :param compression: Compression to apply to each partition, if any; see `open_output`
+    :return: None
+    """
+    output_dir = Path(output_dir)
+    manifest_fi = output_dir / MANIFEST_FI
+    try:
+        with open(manifest_fi) as f:
+            prev_manifest = json.load(f)
+    except FileNotFoundError:
+        prev_manifest = {}
+    partition_rows = {}
+    for row, value in zip(rows, partition_values):
+        partition_rows.setdefault(get_partition(value), []).append(row)
+    reuse = (prev_manifest.get("columns") == fieldnames) and (prev_manifest.get("compression") == compression)
+    prev_partitions = prev_manifest.get("partitions", {}) if reuse else {}
+    partitions = {}
+    for partition in sorted(partition_rows):
+        curr_rows = partition_rows[partition]
+        partition_hash = hashlib.sha1()
+        for row in curr_rows:
+            partition_hash.update(f"{get_row_hash(row, fieldnames)}\n".encode("utf-8"))
+        part_fi = Path(f"year={partition}") / f"part.csv{COMPRESSION_SUFFIXES.get(compression, '')}"
+        partitions[partition] = {"path": part_fi.as_posix(), "rows": len(curr_rows),
+                                 "hash": partition_hash.hexdigest()}
+        if (prev_partitions.get(partition) == partitions[partition]) and (output_dir / part_fi).exists():
+            continue
+        (output_dir / part_fi).parent.mkdir(parents=True, exist_ok=True)
+        with atomic_open(output_dir / part_fi, compression) as f:
+            write_rows(f, curr_rows, fieldnames)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    with atomic_open(manifest_fi) as f:
+        json.dump({"columns": fieldnames, "compression": compression, "partitions": partitions}, f, indent=2)
+    for partition, prev_partition in prev_manifest.get("partitions", {}).items():
+        prev_part_fi = output_dir / prev_partition["path"]
+        if partitions.get(partition, {}).get("path") != prev_partition["path"]:
+            prev_part_fi.unlink(missing_ok=True)
+            if (partition not in partitions) and prev_part_fi.parent.exists() and \
+                    not any(prev_part_fi.parent.iterdir()):
+                prev_part_fi.parent.rmdir()
+
+
+def get_row_values(row: dict, cols: list) -> list:
+    """
+    Get the values of a row as they appear once written to a csv
+    :param row: Dict mapping column names to values
+    :param cols: Columns to get
+    :return: List of string values
+    """
+    return ["" if row.get(col) is None else str(row[col]) for col in cols]
+
+
+def get_row_hash(row: dict, fieldnames: list) -> str:
+    """
+    Hash the values of a row
+    :param row: Dict mapping column names to values
+    :param fieldnames: Columns to hash
+    :return: Hex digest of the row's values
+    """
+    return hashlib.sha1(VALUE_SEP.join(get_row_values(row, fieldnames)).encode("utf-8")).hexdigest()
+
+
+def get_delta_fi(output_fi: str, change: str) -> Path:
+    """
+    Get the name of a delta file
+    :param output_fi: Full output file the delta is for
+    :param change: Type of change the delta file contains ("added", "removed", or "changed")
+    :return: Path like `all_years_bird_counts_added.csv`
+    """
+    output_fi = Path(output_fi)
+    return output_fi.with_name(f"{output_fi.stem}_{change}{output_fi.suffix}")
+
+
+def get_index_fi(output_fi: str) -> Path:
+    """
+    Get the name of the row hash index for an output file
+    :param output_fi: Full output file
+    :return: Path of the index
+    """
+    output_fi = Path(output_fi)
+    return output_fi.with_name(f".{output_fi.name}.index.json")
+
+
+def write_delta(rows: list, fieldnames: list, output_fi: str, key_cols: list = None) -> dict:
+    """
+    Writes the rows that were added, removed, or changed since the last delta run, using an index of row hashes
+    persisted next to `output_fi`. If there is no index, all rows are written as added.
+
+    Rows of tables with `key_cols` are matched by key, and removed rows are written with only their key columns
+    filled in. Rows of other tables are matched by their full contents, so a changed row appears as a removal and
+    an addition, and no "changed" file is written. Removed rows of these tables are read from the previous version
+    of `output_fi`, so this must be called before it is overwritten
+    :param rows: List of dicts mapping column names to values
+    :param fieldnames: Columns of the table
+    :param output_fi: Full output file
+    :param key_cols: Columns that uniquely identify a row, if any
+    :return: The new index, to be saved once `output_fi` is written
+    """
+    try:
+        with open(get_index_fi(output_fi)) as f:
+            prev_index = json.load(f)
+    except FileNotFoundError:
+        prev_index = {}
+    changes = {"added": [], "removed": []}
+    if key_cols:
+        changes["changed"] = []
+        index = {}
+        for row in rows:
+            key = VALUE_SEP.join(get_row_values(row, key_cols))
+            index[key] = get_row_hash(row, fieldnames)
+            if key not in prev_index:
+                changes["added"].append(row)
+            elif prev_index[key] != index[key]:
+                changes["changed"].append(row)
+        changes["removed"] = [dict(zip(key_cols, key.split(VALUE_SEP))) for key in prev_index if key not in index]
+    else:
+        row_hashes = [get_row_hash(row, fieldnames) for row in rows]
+        index = Counter(row_hashes)
+        num_added = Counter({row_hash: count - prev_index.get(row_hash, 0) for row_hash, count in index.items()})
+        for row, row_hash in zip(rows, row_hashes):
+            if num_added[row_hash] > 0:
+                changes["added"].append(row)
+                num_added[row_hash] -= 1
+        num_removed = Counter({row_hash: count - index[row_hash] for row_hash, count in prev_index.items()})
+        if any(count > 0 for count in num_removed.values()):
+            if not os.path.exists(output_fi):
+                print(f"Warning, cannot find rows removed from missing {output_fi}")
+            else:
+                with open(output_fi, encoding="utf-8", newline="") as f:
+                    for row in csv.DictReader(f):
+                        row_hash = get_row_hash(row, fieldnames)
+                        if num_removed[row_hash] > 0:
+                            changes["removed"].append(row)
+                            num_removed[row_hash] -= 1
+                # the file was overwritten by a run without delta outputs since the index was saved
+                num_missing = sum(count for count in num_removed.values() if count > 0)
+                if num_missing:
+                    print(f"Warning, {num_missing} removed rows are missing from {get_delta_fi(output_fi, 'removed')} "
+                          f"because {output_fi} was rewritten without updating its delta index")
+    for change, change_rows in changes.items():
+        write_table(change_rows, fieldnames, get_delta_fi(output_fi, change))
+    return index
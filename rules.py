@@ -0,0 +1,165 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import tempfile
+
+from pathlib import Path
+
+# Increment when the structure of the bundle changes, so that old bundles are rebuilt
+BUNDLE_VERSION = 1
+CONSTANTS_FI = Path(__file__).resolve().parent / "constants.py"
+BUNDLE_FI = Path(__file__).resolve().parent / "rules_bundle.json"
+# mkstemp creates files only their owner can read, but a bundle built by a deploy user must be readable by the service
+BUNDLE_MODE = 0o644
+
+
+def get_source_hash(constants_fi: Path = CONSTANTS_FI) -> str:
+    """
+    Hash the rule definitions, so that a stale bundle can be detected
+    :param constants_fi: File containing the rule tables
+    :return: Hex digest of the file contents
+    """
+    return hashlib.sha256(constants_fi.read_bytes()).hexdigest()
+
+
+def get_exact_lookup(replacements: list) -> dict:
+    """
+    Collapse a list of exact-match replacements into a single lookup. The replacements are applied in order,
+    so the output of one replacement can be matched by a later one
+    :param replacements: List of (from, to) tuples
+    :return: Dict mapping each `from` value to its final replacement
+    """
+    lookup = {}
+    for s_start, _ in replacements:
+        clean = s_start
+        for s_from, s_to in replacements:
+            if clean == s_from:
+                clean = s_to
+        lookup[s_start] = clean
+    return lookup
+
+
+def validate_rule_tables(tables: dict) -> None:
+    """
+    Check that each rule table is well formed, raising a ValueError otherwise
+    :param tables: Dict mapping table names to lists of (from, to) tuples or strings
+    :return: None
+    """
+    for name, table in tables.items():
+        for entry in table:
+            values = entry if isinstance(entry, tuple) else (entry,)
+            if (len(values) not in [1, 2]) or not all(isinstance(v, str) for v in values):
+                raise ValueError(f"Malformed entry in {name}: {entry!r}")
+    for name in ["ALWAYS_SUBS", "DIRECTIONS", "NEEDS_NW", "NEEDS_NE", "ADDRESS_ENDINGS"]:
+        for entry in tables[name]:
+            pattern = entry[0] if isinstance(entry, tuple) else entry
+            try:
+                re.compile(pattern)
+            except re.error as e:
+                raise ValueError(f"Invalid pattern in {name}: {pattern!r} ({e})")
+
+
+def build_rule_bundle(source_hash: str) -> dict:
+    """
+    Convert the rule tables in constants.py into precomputed lookups and regex sources
+    :param source_hash: Hash of constants.py the bundle is built from
+    :return: Dict containing the bundle
+    """
+    import constants
+
+    tables = {name: getattr(constants, name) for name in [
+        "PRE_CLEAN_ADDRESS_REPLACEMENTS", "ALWAYS_SUBS", "DIRECTIONS", "ADDRESS_REPLACEMENTS", "NEEDS_NW",
+        "NEEDS_NE", "ADDRESS_ENDINGS", "BIRD_SUBSTRING_MAPPINGS", "BIRD_REPLACEMENTS"]}
+    validate_rule_tables(tables)
+    return {
+        "version": BUNDLE_VERSION,
+        "source_hash": source_hash,
+        "pre_clean_address_lookup": get_exact_lookup(tables["PRE_CLEAN_ADDRESS_REPLACEMENTS"]),
+        "always_subs": tables["ALWAYS_SUBS"],
+        "directions": tables["DIRECTIONS"],
+        # replacements starting with ^ only apply when they match the whole address
+        "address_replacements": [
+            (s_from, s_to, s_from.strip("^") if s_from.startswith("^") else None)
+            for s_from, s_to in tables["ADDRESS_REPLACEMENTS"]],
+        "needs_quadrant": [(needs_nw, "NW") for needs_nw in tables["NEEDS_NW"]] +
+                          [(needs_ne, "NE") for needs_ne in tables["NEEDS_NE"]],
+        "address_endings": tables["ADDRESS_ENDINGS"],
+        "bird_substring_mappings": tables["BIRD_SUBSTRING_MAPPINGS"],
+        "bird_lookup": get_exact_lookup(tables["BIRD_REPLACEMENTS"]),
+    }
+
+
+def write_rule_bundle(bundle: dict, bundle_fi: Path = BUNDLE_FI) -> None:
+    """
+    Write a bundle, replacing any existing one atomically
+    :param bundle: Bundle from `build_rule_bundle`
+    :param bundle_fi: File to write the bundle to
+    :return: None
+    """
+    fd, tmp_fi = tempfile.mkstemp(dir=Path(bundle_fi).parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode="w") as f:
+            json.dump(bundle, f)
+        os.chmod(tmp_fi, BUNDLE_MODE)
+        os.replace(tmp_fi, bundle_fi)
+    except BaseException:
+        os.unlink(tmp_fi)
+        raise
+
+
+def compile_rule_bundle(bundle: dict) -> dict:
+    """
+    Compile the regexes in a bundle
+    :param bundle: Bundle from `build_rule_bundle` or read from a bundle file
+    :return: Dict of rules ready to be applied by the cleaning functions
+    """
+    return {
+        "pre_clean_address_lookup": bundle["pre_clean_address_lookup"],
+        "always_subs": [(re.compile(s_search), s_to) for s_search, s_to in bundle["always_subs"]],
+        # the directions are substituted in without the surrounding word boundary groups, which are always empty
+        "directions": [(direct, re.compile(rf"(?i)(\b){direct}(\b)"), f", {direct}",
+                        re.compile(rf"(?i)(\b){direct} and(\b)")) for direct in bundle["directions"]],
+        "address_replacements": [tuple(repl) for repl in bundle["address_replacements"]],
+        "needs_quadrant": [(re.compile(rf"{prefix}\s*$"), f"{prefix} {quadrant}")
+                           for prefix, quadrant in bundle["needs_quadrant"]],
+        "address_endings": [re.compile(rf"({ending}).*") for ending in bundle["address_endings"]],
+        "bird_substring_mappings": [tuple(mapping) for mapping in bundle["bird_substring_mappings"]],
+        "bird_lookup": bundle["bird_lookup"],
+    }
+
+
+def load_rule_bundle(bundle_fi: Path = BUNDLE_FI) -> dict:
+    """
+    Load the rule bundle, rebuilding it first if it is missing, from an older version, or out of date with
+    constants.py. If the bundle can't be written (for example, on a read-only filesystem), the rebuilt rules are
+    used without being saved
+    :param bundle_fi: Bundle file
+    :return: Dict of compiled rules
+    """
+    source_hash = get_source_hash()
+    try:
+        with open(bundle_fi) as f:
+            bundle = json.load(f)
+    except FileNotFoundError:
+        bundle = {}
+    except (OSError, ValueError) as e:
+        print(f"Warning, could not read rule bundle {bundle_fi}, rebuilding it: {e}")
+        bundle = {}
+    if (bundle.get("version") != BUNDLE_VERSION) or (bundle.get("source_hash") != source_hash):
+        bundle = build_rule_bundle(source_hash)
+        try:
+            write_rule_bundle(bundle, bundle_fi)
+        except OSError as e:
+            print(f"Warning, could not write rule bundle to {bundle_fi}: {e}")
+    return compile_rule_bundle(bundle)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the rule bundle from constants.py")
+    parser.add_argument("--bundle_fi", default=BUNDLE_FI)
+    args = parser.parse_args()
+
+    write_rule_bundle(build_rule_bundle(get_source_hash()), args.bundle_fi)
+    print(f"Wrote {args.bundle_fi}")
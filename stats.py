@@ -0,0 +1,192 @@
+import datetime
+import functools
+import json
+import time
+import tracemalloc
+
+from typing import Callable, Iterator
+
+# When stats are disabled, `timed_function` and `timed_iter` return their inputs unchanged and the `timed`
+# decorator only checks this flag, so the instrumentation costs close to nothing
+ENABLED = False
+TRACE_MEMORY = False
+# Maps stage names to dicts of calls, wall time, cpu time, and, where recorded, rows and peak memory
+STAGES = {}
+# Running peak memory of each open stage, innermost last
+OPEN_STAGES = []
+RUN_START = {}
+
+
+def enable(trace_memory: bool = False) -> None:
+    """
+    Start collecting stats, clearing any collected so far
+    :param trace_memory: If true, also record the peak memory allocated during each stage with tracemalloc,
+        which slows down the run considerably
+    :return: None
+    """
+    global ENABLED, TRACE_MEMORY
+    ENABLED = True
+    TRACE_MEMORY = trace_memory
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    reset()
+
+
+def reset() -> None:
+    """
+    Clear collected stats
+    :return: None
+    """
+    STAGES.clear()
+    RUN_START.update({"time": datetime.datetime.now().isoformat(), "wall": time.perf_counter(),
+                      "cpu": time.process_time()})
+
+
+def get_stage(name: str) -> dict:
+    """
+    Get the stats of a stage, adding it if needed
+    :param name: Name of the stage
+    :return: Dict of the stage's stats, which can be updated in place
+    """
+    if name not in STAGES:
+        STAGES[name] = {"calls": 0, "wall_time": 0.0, "cpu_time": 0.0}
+    return STAGES[name]
+
+
+def count_rows(name: str, num_rows: int) -> None:
+    """
+    Add to the number of rows handled by a stage
+    :param name: Name of the stage
+    :param num_rows: Number of rows
+    :return: None
+    """
+    if ENABLED:
+        stage = get_stage(name)
+        stage["rows"] = stage.get("rows", 0) + num_rows
+
+
+def start_memory_trace() -> None:
+    """
+    Start tracking the peak memory of a stage. Since tracemalloc has a single peak, the peak so far is first saved
+    to the stages that are already open
+    :return: None
+    """
+    _, peak = tracemalloc.get_traced_memory()
+    for idx in range(len(OPEN_STAGES)):
+        OPEN_STAGES[idx] = max(OPEN_STAGES[idx], peak)
+    tracemalloc.reset_peak()
+    OPEN_STAGES.append(0)
+
+
+def end_memory_trace(stage: dict) -> None:
+    """
+    Record the peak memory of the innermost open stage
+    :param stage: Dict of the stage's stats
+    :return: None
+    """
+    _, peak = tracemalloc.get_traced_memory()
+    peak = max(OPEN_STAGES.pop(), peak)
+    if OPEN_STAGES:
+        OPEN_STAGES[-1] = max(OPEN_STAGES[-1], peak)
+    stage["peak_memory"] = max(stage.get("peak_memory", 0), peak)
+
+
+def timed(name: str) -> Callable:
+    """
+    Decorator that records the time spent in each call of a function as a stage
+    :param name: Name of the stage
+    :return: Decorator
+    """
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return fn(*args, **kwargs)
+            if TRACE_MEMORY:
+                start_memory_trace()
+            start_wall, start_cpu = time.perf_counter(), time.process_time()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                stage = get_stage(name)
+                stage["calls"] += 1
+                stage["wall_time"] += time.perf_counter() - start_wall
+                stage["cpu_time"] += time.process_time() - start_cpu
+                if TRACE_MEMORY:
+                    end_memory_trace(stage)
+        return wrapper
+    return decorator
+
+
+def timed_function(name: str, fn: Callable) -> Callable:
+    """
+    Time a function that is called once per row, like a normalizer. Memory isn't traced for these stages
+    :param name: Name of the stage
+    :param fn: Function to time
+    :return: `fn` itself if stats are disabled, otherwise a version of `fn` that records its time
+    """
+    if not ENABLED:
+        return fn
+
+    def wrapper(*args):
+        start_wall, start_cpu = time.perf_counter(), time.process_time()
+        try:
+            return fn(*args)
+        finally:
+            stage = get_stage(name)
+            stage["calls"] += 1
+            stage["wall_time"] += time.perf_counter() - start_wall
+            stage["cpu_time"] += time.process_time() - start_cpu
+    return wrapper
+
+
+def timed_iter(name: str, rows: Iterator) -> Iterator:
+    """
+    Time the production of each item of an iterator, like the rows read from a file
+    :param name: Name of the stage
+    :param rows: Iterator to time
+    :return: `rows` itself if stats are disabled, otherwise an iterator over `rows` that records its time
+    """
+    if not ENABLED:
+        return rows
+    return _timed_iter(name, iter(rows))
+
+
+def _timed_iter(name: str, rows: Iterator) -> Iterator:
+    """
+    Iterate over `rows`, recording the time spent producing each item
+    :param name: Name of the stage
+    :param rows: Iterator to time
+    :return: Iterator over `rows`
+    """
+    stage = get_stage(name)
+    stage["calls"] += 1
+    stage.setdefault("rows", 0)
+    while True:
+        start_wall, start_cpu = time.perf_counter(), time.process_time()
+        try:
+            row = next(rows)
+        except StopIteration:
+            return
+        finally:
+            stage["wall_time"] += time.perf_counter() - start_wall
+            stage["cpu_time"] += time.process_time() - start_cpu
+        stage["rows"] += 1
+        yield row
+
+
+def write_stats(output_fi: str) -> None:
+    """
+    Write the stats collected since they were last enabled or reset to a json file
+    :param output_fi: File to write
+    :return: None
+    """
+    stats = {
+        "started": RUN_START["time"],
+        "wall_time": time.perf_counter() - RUN_START["wall"],
+        "cpu_time": time.process_time() - RUN_START["cpu"],
+        "trace_memory": TRACE_MEMORY,
+        "stages": STAGES,
+    }
+    with open(output_fi, mode="w") as f:
+        json.dump(stats, f, indent=2)
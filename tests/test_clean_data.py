@@ -1,9 +1,18 @@
+import datetime
+import os
+import tempfile
 import unittest
 
 from collections import OrderedDict
 
-from ..clean_data import clean_address, clean_date, clean_bird
-from ..constants import CONVENTION_CTR, MLK, UNKNOWN_DATE, THURGOOD, DOE, GU
+from ..clean_data import clean_address, clean_date, clean_bird, count_date, get_cleaned_data, get_col_idxs, \
+    get_season
+from ..constants import CONVENTION_CTR, MLK, SHADING_COL, UNKNOWN_DATE, THURGOOD, DOE, GU
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
 
 
 class TestCleanData(unittest.TestCase):
@@ -66,3 +75,50 @@ class TestCleanData(unittest.TestCase):
         self.assertEqual("Alder Flycatcher", clean_bird("Alder Flycatcher"))
         self.assertEqual("Warbler Species", clean_bird("Warbler sp."))
         self.assertEqual("Warbler Species", clean_bird("Warbler sp"))
+
+    def test_get_season(self):
+        self.assertEqual("Spring", get_season(datetime.date(2021, 5, 12)))
+        self.assertEqual("Fall", get_season(datetime.date(2021, 9, 30)))
+        self.assertEqual("Other", get_season(datetime.date(2021, 1, 2)))
+
+    def test_count_date(self):
+        date_counts = {}
+        for date in ["2021-09-30", "2021-09-30", UNKNOWN_DATE]:
+            count_date({"Date": date, "Clean Address": MLK, "Clean Bird Species": "Ovenbird"}, date_counts)
+        self.assertEqual({datetime.date(2021, 9, 30): {MLK: {"Ovenbird": 2}}}, date_counts)
+
+    def test_get_col_idxs(self):
+        self.assertEqual([1, 3], get_col_idxs(["Date", "Location", "Species", "Location"], ["Address", "Location"]))
+        self.assertEqual([2, 0, 1], get_col_idxs(["notes", "notes", "Street Address"], ["Street Address", "notes"]))
+
+    def test_get_cleaned_data_repeated_cols(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            input_fi = os.path.join(tmp_dir, "2019.csv")
+            with open(input_fi, mode="w") as f:
+                f.write("Date,Species,Street Address,notes,notes\n9/1/19,Ovenbird,430 E St NW,found by Jo,\n"
+                        "9/2/19,Ovenbird,,,Glass entry\n")
+            cleaned_rows = get_cleaned_data(input_fi, 2019)[0]
+        self.assertEqual(["430 E St NW", "Glass entry"], [row["Address where found"] for row in cleaned_rows])
+
+    @unittest.skipIf(openpyxl is None, "openpyxl is not installed")
+    def test_get_cleaned_data_xlsx(self):
+        workbook = openpyxl.Workbook()
+        workbook.active.append(["Total birds", 2])
+        sheet = workbook.create_sheet("Data")
+        sheet.append(["2017 Lights Out Inventory"])
+        sheet.append([])
+        sheet.append(["Date", "Bird Species, if known", "Address where found"])
+        sheet.append(["9/1/17", "Ovenbird", "430 E St NW"])
+        sheet.append(["9/2/17", "Gray Catbird", "430 E St NW"])
+        sheet["A5"].fill = openpyxl.styles.PatternFill(fill_type="solid", fgColor="FFC0C0C0")
+        sheet.append([])
+        # legend lines with text in the bird column, which would otherwise be cleaned as birds
+        sheet.append(["Gray shading:", "Birds left at site or released"])
+        sheet.append([None, "Note: Some ID numbers have been removed"])
+        sheet.append(["Final:", "2 birds"])
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            input_fi = os.path.join(tmp_dir, "2017.xlsx")
+            workbook.save(input_fi)
+            cleaned_rows = get_cleaned_data(input_fi, 2017)[0]
+        self.assertEqual([("2017-09-01", "Ovenbird", ""), ("2017-09-02", "Gray Catbird", "#C0C0C0")],
+                         [(row["Date"], row["Clean Bird Species"], row[SHADING_COL]) for row in cleaned_rows])
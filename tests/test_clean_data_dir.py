@@ -0,0 +1,77 @@
+import asyncio
+import csv
+import os
+import tempfile
+import unittest
+
+from pathlib import Path
+
+from ..clean_data_dir import get_input_files, watch_data, write_outputs
+
+SHEET_HEADER = 'Date,"Bird Species, if known",Address where found\n'
+
+
+def write_sheet(input_fi: str, rows: list) -> None:
+    with open(input_fi, mode="w") as f:
+        f.write(SHEET_HEADER)
+        for row in rows:
+            f.write(f"{row}\n")
+
+
+def read_birds(output_dir: str) -> list:
+    with open(os.path.join(output_dir, "all_years_clean.csv")) as f:
+        return sorted(row["Clean Bird Species"] for row in csv.DictReader(f))
+
+
+async def wait_for(condition, timeout: float = 5) -> bool:
+    for _ in range(int(timeout / 0.01)):
+        if condition():
+            return True
+        await asyncio.sleep(0.01)
+    return False
+
+
+class TestCleanDataDir(unittest.TestCase):
+    def test_get_input_files(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for fi in ["2019.csv", ".2019.csv.swp", "~$2019.xlsx"]:
+                Path(tmp_dir, fi).touch()
+            os.mkdir(os.path.join(tmp_dir, "archive"))
+            self.assertEqual([Path(tmp_dir, "2019.csv")], list(get_input_files(tmp_dir)))
+
+    def test_write_outputs_partitions_clean_rows_by_sheet_year(self):
+        rows = [{"Date": "2020-01-02", "Clean Bird Species": "Ovenbird", "Clean Address": "430 E St NW"},
+                {"Date": "Unknown", "Clean Bird Species": "Gray Catbird", "Clean Address": "430 E St NW"}]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            write_outputs([("2019.csv", 2019, rows)], tmp_dir, layout="partitioned")
+            table_dir = os.path.join(tmp_dir, "all_years_clean")
+            # a date typo in a 2019 sheet doesn't move the row away from its counts
+            self.assertEqual(["_manifest.json", "year=2019"], sorted(os.listdir(table_dir)))
+            with open(os.path.join(table_dir, "year=2019", "part.csv")) as f:
+                self.assertEqual(["Ovenbird", "Gray Catbird"],
+                                 [row["Clean Bird Species"] for row in csv.DictReader(f)])
+            self.assertEqual(["_manifest.json", "year=2019"],
+                             sorted(os.listdir(os.path.join(tmp_dir, "all_years_bird_counts"))))
+
+    def test_watch_data(self):
+        async def run(input_dir: str, output_dir: str):
+            write_sheet(os.path.join(input_dir, "2019.csv"), ["9/1/19,Ovenbird,430 E St NW"])
+            watch = asyncio.create_task(watch_data(input_dir, output_dir, poll_interval=0.01, debounce=0.01))
+            try:
+                # the output directory doesn't exist yet, so the first rewrite fails without ending the watch
+                await asyncio.sleep(0.2)
+                self.assertFalse(watch.done())
+                os.mkdir(output_dir)
+                write_sheet(os.path.join(input_dir, "2020.csv"), ["9/1/20,Gray Catbird,430 E St NW"])
+                clean_fi = os.path.join(output_dir, "all_years_clean.csv")
+                self.assertTrue(await wait_for(lambda: os.path.exists(clean_fi)))
+                self.assertEqual(["Gray Catbird", "Ovenbird"], read_birds(output_dir))
+                os.remove(os.path.join(input_dir, "2019.csv"))
+                self.assertTrue(await wait_for(lambda: read_birds(output_dir) == ["Gray Catbird"]))
+            finally:
+                watch.cancel()
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            input_dir = os.path.join(tmp_dir, "input")
+            os.mkdir(input_dir)
+            asyncio.run(run(input_dir, os.path.join(tmp_dir, "output")))
@@ -0,0 +1,35 @@
+import unittest
+
+from ..dedup import drop_duplicates
+
+
+def make_row(bird: str, cw_number: str = "", address: str = "430 E St NW") -> dict:
+    return {"Date": "2019-09-01", "Clean Bird Species": bird, "Clean Address": address, "CW Number": cw_number}
+
+
+class TestDedup(unittest.TestCase):
+    def test_drop_duplicates_fingerprint(self):
+        catbird = make_row("Gray Catbird")
+        results, num_duplicates, conflicts = drop_duplicates([
+            ("route.csv", 2019, [catbird, catbird, make_row("Ovenbird")]),
+            ("master.csv", 2019, [catbird, catbird, catbird]),
+        ])
+        # repeated rows within a file are kept, but each can only be matched once by the other file
+        self.assertEqual(3, len(results[0][2]))
+        self.assertEqual([catbird], results[1][2])
+        self.assertEqual(2, num_duplicates)
+        self.assertEqual([], conflicts)
+
+    def test_drop_duplicates_cw_number(self):
+        results, num_duplicates, conflicts = drop_duplicates([
+            ("route.csv", 2019, [make_row("Gray Catbird", "12"), make_row("Ovenbird")]),
+            ("master.csv", 2019, [make_row("Gray Catbird", "13"), make_row("Ovenbird", "14"),
+                                  make_row("Ovenbird", "12")]),
+            ("2020.csv", 2020, [make_row("Gray Catbird", "12")]),
+        ])
+        # the Ovenbird numbered 12 conflicts with the route's Gray Catbird 12, so both stay counted
+        self.assertEqual([make_row("Gray Catbird", "13"), make_row("Ovenbird", "12")], results[1][2])
+        self.assertEqual(1, len(results[2][2]))
+        self.assertEqual(1, num_duplicates)
+        self.assertEqual([("route.csv", "Gray Catbird"), ("master.csv", "Ovenbird")],
+                         [(conflict["File"], conflict["Clean Bird Species"]) for conflict in conflicts])
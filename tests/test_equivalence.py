@@ -0,0 +1,22 @@
+import unittest
+
+from ..equivalence import find_divergences, get_fuzz_corpus, get_rule_corpus, shrink
+
+
+class TestEquivalence(unittest.TestCase):
+    def test_find_divergences(self):
+        corpus = {normalizer: set(sorted(values)[:1000]) for normalizer, values in get_rule_corpus().items()}
+        for normalizer, values in get_fuzz_corpus(corpus, 200, 0).items():
+            corpus[normalizer].update(values)
+        self.assertEqual([], find_divergences(corpus))
+
+    def test_shrink(self):
+        def legacy_fn(value):
+            return value.strip()
+
+        def candidate_fn(value):
+            if "(m)" in value:
+                raise ValueError(value)
+            return value.strip()
+
+        self.assertEqual("(m)", shrink("Northern Cardinal (m), east side", legacy_fn, candidate_fn))
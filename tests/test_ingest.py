@@ -0,0 +1,104 @@
+import codecs
+import datetime
+import gzip
+import os
+import tempfile
+import unittest
+import zipfile
+
+from ..ingest import SAMPLE_SIZE, detect_delimiter, detect_encoding, format_cell_value, get_xlsx_shading, \
+    iter_rows
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+ODS_CONTENT = """<?xml version="1.0" encoding="UTF-8"?>
+<office:document-content xmlns:office="urn:oasis:names:tc:opendocument:xmlns:office:1.0"
+    xmlns:style="urn:oasis:names:tc:opendocument:xmlns:style:1.0"
+    xmlns:table="urn:oasis:names:tc:opendocument:xmlns:table:1.0"
+    xmlns:text="urn:oasis:names:tc:opendocument:xmlns:text:1.0"
+    xmlns:fo="urn:oasis:names:tc:opendocument:xmlns:xsl-fo-compatible:1.0">
+<office:automatic-styles>
+<style:style style:name="gray"><style:table-cell-properties fo:background-color="#c0c0c0"/></style:style>
+<style:style style:name="white"><style:table-cell-properties fo:background-color="#ffffff"/></style:style>
+</office:automatic-styles>
+<office:body><office:spreadsheet><table:table>
+<table:table-row><table:table-cell><text:p>Date</text:p></table:table-cell>
+<table:table-cell><text:p>Bird Species, if known</text:p></table:table-cell></table:table-row>
+<table:table-row><table:table-cell table:style-name="white"><text:p>9/1/18</text:p></table:table-cell>
+<table:table-cell><text:p>Ovenbird</text:p></table:table-cell>
+<table:table-cell table:style-name="white" table:number-columns-repeated="16000"/></table:table-row>
+<table:table-row><table:table-cell><text:p>9/2/18</text:p></table:table-cell>
+<table:table-cell><text:p>Gray Catbird</text:p></table:table-cell>
+<table:table-cell table:style-name="gray" table:number-columns-repeated="16000"/></table:table-row>
+<table:table-row table:number-rows-repeated="1048000">
+<table:table-cell table:style-name="white" table:number-columns-repeated="16000"/></table:table-row>
+</table:table></office:spreadsheet></office:body></office:document-content>
+"""
+
+
+
+class TestIngest(unittest.TestCase):
+    def test_detect_encoding(self):
+        self.assertEqual("utf-8-sig", detect_encoding(codecs.BOM_UTF8 + "Date,Species".encode("utf-8")))
+        self.assertEqual("utf-8", detect_encoding("Café".encode("utf-8")))
+        # sample cut off partway through a multibyte character
+        self.assertEqual("utf-8", detect_encoding("Café".encode("utf-8")[:-1]))
+        self.assertEqual("cp1252", detect_encoding("Café – 1 St NW".encode("cp1252")))
+
+    def test_detect_delimiter(self):
+        self.assertEqual(",", detect_delimiter("Date,Species,Location\n1/1/22;a;b"))
+        self.assertEqual(";", detect_delimiter("Date;Species;Location, if known\n"))
+        self.assertEqual("\t", detect_delimiter("Date\tSpecies\n"))
+        self.assertEqual(",", detect_delimiter("Date\n"))
+
+    def test_iter_rows(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            input_fi = os.path.join(tmp_dir, "2017.csv")
+            with open(input_fi, mode="wb") as f:
+                f.write(codecs.BOM_UTF8 + "Date;Species\r\n9/1/17;\"Robin; juvenile\"\r\n".encode("utf-8"))
+            self.assertEqual([["Date", "Species"], ["9/1/17", "Robin; juvenile"]], list(iter_rows(input_fi)))
+
+    def test_iter_rows_late_non_ascii(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            input_fi = os.path.join(tmp_dir, "2016.csv")
+            num_rows = 2 * SAMPLE_SIZE // len("9/1/16,Ovenbird\r\n")
+            with open(input_fi, mode="wb") as f:
+                f.write(("Date,Species\r\n" + "9/1/16,Ovenbird\r\n" * num_rows + "9/2/16,Café\r\n").encode("cp1252"))
+            rows = list(iter_rows(input_fi))
+            self.assertEqual(num_rows + 2, len(rows))
+            self.assertEqual(["9/2/16", "Café"], rows[-1])
+
+    def test_iter_rows_gzip(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            input_fi = os.path.join(tmp_dir, "2018.csv.gz")
+            with gzip.open(input_fi, mode="wb") as f:
+                f.write("Date,Species\r\n9/1/18,Café\r\n".encode("cp1252"))
+            self.assertEqual([["Date", "Species"], ["9/1/18", "Café"]], list(iter_rows(input_fi)))
+
+    def test_iter_rows_ods(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            input_fi = os.path.join(tmp_dir, "2018.ods")
+            with zipfile.ZipFile(input_fi, mode="w") as zf:
+                zf.writestr("content.xml", ODS_CONTENT)
+            # the repeated empty row at the end of the tab isn't expanded
+            rows = list(iter_rows(input_fi))
+            self.assertEqual([["Date", "Bird Species, if known", "Cell Shading"], ["9/1/18", "Ovenbird", ""],
+                              ["9/2/18", "Gray Catbird", "#C0C0C0"]], rows)
+
+    @unittest.skipIf(openpyxl is None, "openpyxl is not installed")
+    def test_get_xlsx_shading(self):
+        cell = openpyxl.Workbook().active["A1"]
+        self.assertEqual("", get_xlsx_shading(cell))
+        cell.fill = openpyxl.styles.PatternFill(fill_type="solid", fgColor="FFFFFFFF")
+        self.assertEqual("", get_xlsx_shading(cell))
+        cell.fill = openpyxl.styles.PatternFill(fill_type="solid", fgColor="FFFFFF00")
+        self.assertEqual("#FFFF00", get_xlsx_shading(cell))
+
+    def test_format_cell_value(self):
+        self.assertEqual("09/01/2017", format_cell_value(datetime.datetime(2017, 9, 1)))
+        self.assertEqual("07:30", format_cell_value(datetime.time(7, 30)))
+        self.assertEqual("12", format_cell_value(12.0))
+        self.assertEqual("", format_cell_value(None))
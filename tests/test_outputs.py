@@ -0,0 +1,142 @@
+import contextlib
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from ..outputs import atomic_open, get_delta_fi, get_partition, write_table
+
+
+def read_csv(input_fi) -> list:
+    with open(input_fi, newline="") as f:
+        return list(csv.DictReader(f))
+
+
+class TestOutputs(unittest.TestCase):
+    def test_atomic_open(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output_fi = os.path.join(tmp_dir, "all_years_clean.csv")
+            with atomic_open(output_fi) as f:
+                f.write("old")
+            with self.assertRaises(ValueError):
+                with atomic_open(output_fi) as f:
+                    f.write("new")
+                    raise ValueError()
+            with open(output_fi) as f:
+                self.assertEqual("old", f.read())
+            self.assertEqual(["all_years_clean.csv"], os.listdir(tmp_dir))
+
+    def test_write_table_delta_keyed(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output_fi = os.path.join(tmp_dir, "all_years_bird_counts.csv")
+            fieldnames = ["Bird", "Year", "Count"]
+            write_table([{"Bird": "Ovenbird", "Year": 2019, "Count": 2}, {"Bird": "Gray Catbird", "Year": 2019,
+                         "Count": 1}], fieldnames, output_fi, key_cols=["Bird", "Year"], delta=True)
+            self.assertEqual(2, len(read_csv(get_delta_fi(output_fi, "added"))))
+            write_table([{"Bird": "Ovenbird", "Year": 2019, "Count": 3}, {"Bird": "American Robin", "Year": 2019,
+                         "Count": 1}], fieldnames, output_fi, key_cols=["Bird", "Year"], delta=True)
+            self.assertEqual([{"Bird": "American Robin", "Year": "2019", "Count": "1"}],
+                             read_csv(get_delta_fi(output_fi, "added")))
+            self.assertEqual([{"Bird": "Gray Catbird", "Year": "2019", "Count": ""}],
+                             read_csv(get_delta_fi(output_fi, "removed")))
+            self.assertEqual([{"Bird": "Ovenbird", "Year": "2019", "Count": "3"}],
+                             read_csv(get_delta_fi(output_fi, "changed")))
+
+    def test_write_table_delta_unkeyed(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output_fi = os.path.join(tmp_dir, "all_years_clean.csv")
+            fieldnames = ["Date", "Clean Bird Species"]
+            ovenbird = {"Date": "2019-09-01", "Clean Bird Species": "Ovenbird"}
+            catbird = {"Date": "2019-09-02", "Clean Bird Species": "Gray Catbird"}
+            write_table([ovenbird, ovenbird, catbird], fieldnames, output_fi, delta=True)
+            write_table([ovenbird, catbird, catbird], fieldnames, output_fi, delta=True)
+            self.assertEqual([catbird], read_csv(get_delta_fi(output_fi, "added")))
+            self.assertEqual([ovenbird], read_csv(get_delta_fi(output_fi, "removed")))
+            self.assertFalse(os.path.exists(get_delta_fi(output_fi, "changed")))
+
+    def test_write_table_delta_multiline(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output_fi = os.path.join(tmp_dir, "all_years_clean.csv")
+            fieldnames = ["Date", "Address where found"]
+            multiline = {"Date": "2019-09-01", "Address where found": "430 E St NW\r\nby the loading dock"}
+            other = {"Date": "2019-09-02", "Address where found": "430 E St NW"}
+            write_table([multiline, other], fieldnames, output_fi, delta=True)
+            stdout = io.StringIO()
+            with contextlib.redirect_stdout(stdout):
+                write_table([other], fieldnames, output_fi, delta=True)
+            self.assertEqual([multiline], read_csv(get_delta_fi(output_fi, "removed")))
+            self.assertEqual("", stdout.getvalue())
+
+    def test_write_table_delta_overwritten(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output_fi = os.path.join(tmp_dir, "all_years_clean.csv")
+            fieldnames = ["Date", "Clean Bird Species"]
+            ovenbird = {"Date": "2019-09-01", "Clean Bird Species": "Ovenbird"}
+            catbird = {"Date": "2019-09-02", "Clean Bird Species": "Gray Catbird"}
+            write_table([ovenbird, catbird], fieldnames, output_fi, delta=True)
+            write_table([catbird], fieldnames, output_fi)
+            stdout = io.StringIO()
+            with contextlib.redirect_stdout(stdout):
+                write_table([catbird], fieldnames, output_fi, delta=True)
+            self.assertEqual([], read_csv(get_delta_fi(output_fi, "removed")))
+            self.assertIn("1 removed rows are missing", stdout.getvalue())
+
+    def test_write_table_delta_compressed(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with self.assertRaises(ValueError):
+                write_table([], ["Bird"], os.path.join(tmp_dir, "all_years_bird_counts.csv"), delta=True,
+                            compression="gzip")
+
+    def test_get_partition(self):
+        self.assertEqual("2019", get_partition("2019-09-01"))
+        self.assertEqual("2019", get_partition(2019))
+        self.assertEqual("unknown", get_partition("Unknown"))
+        self.assertEqual("unknown", get_partition(None))
+
+    def test_write_table_partitioned(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output_fi = os.path.join(tmp_dir, "all_years_clean.csv")
+            table_dir = os.path.join(tmp_dir, "all_years_clean")
+            fieldnames = ["Date", "Clean Bird Species"]
+            rows = [{"Date": "2019-09-01", "Clean Bird Species": "Ovenbird"},
+                    {"Date": "2020-09-02", "Clean Bird Species": "Gray Catbird"},
+                    {"Date": "Unknown", "Clean Bird Species": "Ovenbird"}]
+            write_table(rows, fieldnames, output_fi, partition_col="Date", layout="partitioned", compression="gzip")
+            self.assertFalse(os.path.exists(output_fi))
+            with open(os.path.join(table_dir, "_manifest.json")) as f:
+                manifest = json.load(f)
+            self.assertEqual(["2019", "2020", "unknown"], list(manifest["partitions"]))
+            self.assertEqual({"path": "year=2019/part.csv.gz", "rows": 1},
+                             {k: v for k, v in manifest["partitions"]["2019"].items() if k != "hash"})
+            part_2019 = os.path.join(table_dir, "year=2019", "part.csv.gz")
+            with gzip.open(part_2019, mode="rt", newline="") as f:
+                self.assertEqual([rows[0]], list(csv.DictReader(f)))
+            # only the partitions that changed are rewritten, and empty ones are removed
+            mtime_2019 = os.stat(part_2019).st_mtime_ns
+            write_table(rows[:1] + [{"Date": "2020-09-03", "Clean Bird Species": "Ovenbird"}], fieldnames, output_fi,
+                        partition_col="Date", layout="partitioned", compression="gzip")
+            self.assertEqual(mtime_2019, os.stat(part_2019).st_mtime_ns)
+            with gzip.open(os.path.join(table_dir, "year=2020", "part.csv.gz"), mode="rt", newline="") as f:
+                self.assertEqual([{"Date": "2020-09-03", "Clean Bird Species": "Ovenbird"}], list(csv.DictReader(f)))
+            self.assertEqual(["_manifest.json", "year=2019", "year=2020"], sorted(os.listdir(table_dir)))
+
+    def test_write_table_compressed_reproducible(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            contents = []
+            for name in ["a.csv", "b.csv"]:
+                output_fi = os.path.join(tmp_dir, name)
+                write_table([{"Bird": "Ovenbird", "Count": 2}], ["Bird", "Count"], output_fi, compression="gzip")
+                with open(f"{output_fi}.gz", mode="rb") as f:
+                    contents.append(f.read())
+            self.assertEqual(contents[0], contents[1])
+
+    def test_write_table_compressed(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output_fi = os.path.join(tmp_dir, "total_bldg_counts.csv")
+            write_table([{"Building": "430 E St NW", "Count": 2}], ["Building", "Count"], output_fi,
+                        partition_col=None, layout="partitioned", compression="gzip")
+            with gzip.open(f"{output_fi}.gz", mode="rt", newline="") as f:
+                self.assertEqual([{"Building": "430 E St NW", "Count": "2"}], list(csv.DictReader(f)))
@@ -0,0 +1,44 @@
+import json
+import os
+import stat
+import tempfile
+import unittest
+
+from ..rules import BUNDLE_VERSION, build_rule_bundle, get_exact_lookup, get_source_hash, load_rule_bundle, \
+    validate_rule_tables, write_rule_bundle
+
+
+class TestRules(unittest.TestCase):
+    def test_get_exact_lookup(self):
+        lookup = get_exact_lookup([("Robin", "American Robin"), ("Cardinal", "American Cardinal"),
+                                   ("American Cardinal", "Northern Cardinal")])
+        self.assertEqual("American Robin", lookup["Robin"])
+        self.assertEqual("Northern Cardinal", lookup["Cardinal"])
+        self.assertEqual("Northern Cardinal", lookup["American Cardinal"])
+
+    def test_validate_rule_tables(self):
+        tables = {"ALWAYS_SUBS": [("(?i)^Zoo", "3001 Connecticut Ave NW")], "DIRECTIONS": ["NW"], "NEEDS_NW": [],
+                  "NEEDS_NE": [], "ADDRESS_ENDINGS": []}
+        validate_rule_tables(tables)
+        tables["ALWAYS_SUBS"].append(("(Zoo", "3001 Connecticut Ave NW"))
+        with self.assertRaises(ValueError):
+            validate_rule_tables(tables)
+        tables["ALWAYS_SUBS"] = [("Zoo", None)]
+        with self.assertRaises(ValueError):
+            validate_rule_tables(tables)
+
+    def test_load_rule_bundle_rebuilds_stale(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            bundle_fi = os.path.join(tmp_dir, "rules_bundle.json")
+            bundle = build_rule_bundle(get_source_hash())
+            for stale in [{"source_hash": "stale"}, {"version": BUNDLE_VERSION - 1}]:
+                # an out of date bundle, with an empty bird lookup that would be used if it were loaded as is
+                write_rule_bundle({**bundle, "bird_lookup": {}, **stale}, bundle_fi)
+                rules = load_rule_bundle(bundle_fi)
+                self.assertEqual(bundle["bird_lookup"], rules["bird_lookup"])
+                with open(bundle_fi) as f:
+                    rewritten = json.load(f)
+                self.assertEqual(get_source_hash(), rewritten["source_hash"])
+                self.assertEqual(BUNDLE_VERSION, rewritten["version"])
+                self.assertEqual(bundle["bird_lookup"], rewritten["bird_lookup"])
+            self.assertEqual(0o644, stat.S_IMODE(os.stat(bundle_fi).st_mode))
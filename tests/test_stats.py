@@ -0,0 +1,40 @@
+import os
+import tempfile
+import unittest
+
+from .. import stats
+from ..clean_data import write_bird_counts
+# clean_data imports stats as a top-level module, which may be a different module object than the one above
+from ..clean_data import stats as clean_data_stats
+
+
+class TestStats(unittest.TestCase):
+    def tearDown(self):
+        for module in [stats, clean_data_stats]:
+            module.ENABLED = False
+            module.TRACE_MEMORY = False
+            module.reset()
+
+    def test_disabled(self):
+        self.assertIs(len, stats.timed_function("len", len))
+        rows = iter([1, 2])
+        self.assertIs(rows, stats.timed_iter("parse", rows))
+        stats.timed("sum")(sum)([1, 2])
+        self.assertEqual({}, stats.STAGES)
+
+    def test_enabled(self):
+        stats.enable(trace_memory=True)
+        self.assertEqual(3, stats.timed("sum")(sum)([1, 2]))
+        self.assertEqual([1, 2], list(stats.timed_iter("parse", [1, 2])))
+        stats.count_rows("sum", 2)
+        self.assertEqual(1, stats.STAGES["sum"]["calls"])
+        self.assertEqual(2, stats.STAGES["sum"]["rows"])
+        self.assertIn("peak_memory", stats.STAGES["sum"])
+        self.assertEqual(2, stats.STAGES["parse"]["rows"])
+
+    def test_writer_rows(self):
+        clean_data_stats.enable()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            write_bird_counts({2019: {"Ovenbird": 2, "Gray Catbird": 1}}, os.path.join(tmp_dir, "all_years"))
+        self.assertEqual(1, clean_data_stats.STAGES["write_bird_counts"]["calls"])
+        self.assertEqual(2, clean_data_stats.STAGES["write_bird_counts"]["rows"])